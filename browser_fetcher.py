@@ -3,109 +3,246 @@ Browser-based HTML Fetcher using Selenium (headless).
 For sites that require JavaScript execution like Meta Careers.
 """
 
+import atexit
+import functools
+import importlib.util
+import math
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from typing import Optional
 
-try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.chrome.service import Service
-    from webdriver_manager.chrome import ChromeDriverManager
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.common.exceptions import TimeoutException
-    SELENIUM_AVAILABLE = True
-except ImportError:
-    SELENIUM_AVAILABLE = False
+# Selenium is heavy to import, so only check that it is installed here and
+# import it on first use (HTTP-only runs and DB scripts never pay for it)
+SELENIUM_AVAILABLE = (
+    importlib.util.find_spec("selenium") is not None
+    and importlib.util.find_spec("webdriver_manager") is not None
+)
 
 import os
 import shutil
 
 
+from config import config
 from logger import get_logger
 
 logger = get_logger(__name__)
 
+_selenium: Optional[SimpleNamespace] = None
+
+
+def _ensure_selenium() -> SimpleNamespace:
+    """Import Selenium on first call and memoize the names we use."""
+    global _selenium
+    if _selenium is None:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.common.by import By
+        from webdriver_manager.chrome import ChromeDriverManager
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        _selenium = SimpleNamespace(
+            webdriver=webdriver, Options=Options, Service=Service, By=By,
+            ChromeDriverManager=ChromeDriverManager, WebDriverWait=WebDriverWait,
+            EC=EC, TimeoutException=TimeoutException,
+        )
+    return _selenium
+
+
+def _is_termux() -> bool:
+    """Check if running in Termux (Android)."""
+    return 'com.termux' in os.environ.get('PREFIX', '') or os.path.exists("/data/data/com.termux")
+
+
+# Chrome switches, keyed by name so a flag can only appear once
+# (None = bare switch). Termux flags are layered on top of the base set.
+BASE_CHROME_FLAGS: dict[str, Optional[str]] = {
+    "--headless": None, # Revert to legacy headless (lighter?)
+    "--no-sandbox": None,
+    # Aggressive memory saving
+    "--disk-cache-size": "1",
+    "--media-cache-size": "1",
+    # Standard linux flags
+    "--disable-gpu": None,
+    "--disable-dev-shm-usage": None,
+    "--window-size": "800,600", # Smaller window = less RAM
+    "--blink-settings": "imagesEnabled=false", # HTML only, no image decoding
+    "--enable-precise-memory-info": None, # Real performance.memory numbers for recycling
+    "--user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+
+TERMUX_CHROME_FLAGS: dict[str, Optional[str]] = {
+    "--remote-debugging-port": "9222",
+    # CRITICAL MEMORY SAVERS: Disable Site Isolation (huge RAM saver)
+    "--disable-features": "IsolateOrigins,site-per-process",
+    "--disable-site-isolation-trials": None,
+    "--disable-sync": None,
+    "--disable-cloud-import": None,
+    "--disable-gpu-compositing": None,
+    "--disable-accelerated-2d-canvas": None,
+    "--enable-features": "NetworkServiceInProcess",
+    # Evasion of Phantom Process Killer
+    "--single-process": None, # The Big One
+    "--in-process-gpu": None,
+    "--renderer-process-limit": "1",
+    "--enable-low-end-device-mode": None,
+    # NUCLEAR OPTION: OTA (Over The Air) & Background updates disabled
+    "--disable-breakpad": None,
+    "--disable-client-side-phishing-detection": None,
+    "--disable-component-extensions-with-background-pages": None,
+    "--disable-default-apps": None,
+    "--disable-extensions": None,
+    "--disable-background-networking": None,
+    # Use Mobile User Agent to get lighter pages
+    "--user-agent": "Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36",
+}
+
+# The parser only needs the HTML, so skip downloading everything else
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.mp3",
+    "*.css",
+]
+
+
+# Serializes a copy of the page without the nodes the parser strips anyway
+# (scripts, styles, SVG, comments...), so far less HTML crosses the driver
+# connection than with page_source. The live DOM is left untouched.
+EXTRACT_HTML_JS = """
+var root = document.documentElement.cloneNode(true);
+root.querySelectorAll('script, style, noscript, template, svg, iframe, link, meta')
+    .forEach(function (el) { el.remove(); });
+var walker = document.createTreeWalker(root, NodeFilter.SHOW_COMMENT);
+var comments = [];
+while (walker.nextNode()) { comments.push(walker.currentNode); }
+comments.forEach(function (c) { c.remove(); });
+return root.outerHTML;
+"""
+
+
+# Scrolls to the bottom whenever the DOM goes quiet and the page has grown,
+# resolving once it stops growing (or after maxRounds scrolls)
+AUTO_SCROLL_JS = """
+var done = arguments[arguments.length - 1];
+var maxRounds = arguments[0], quietMs = arguments[1];
+var rounds = 0, lastHeight = 0, timer = null;
+var observer = new MutationObserver(function () {
+    clearTimeout(timer);
+    timer = setTimeout(settle, quietMs);
+});
+function settle() {
+    var height = document.body.scrollHeight;
+    if (height > lastHeight && rounds < maxRounds) {
+        lastHeight = height;
+        rounds++;
+        window.scrollTo(0, height);
+        timer = setTimeout(settle, quietMs);
+    } else {
+        observer.disconnect();
+        done(rounds);
+    }
+}
+observer.observe(document.body, {childList: true, subtree: true});
+settle();
+"""
+
+
+@functools.lru_cache(maxsize=1)
+def _chromedriver_path() -> str:
+    """
+    Resolve the chromedriver path once per process.
+    
+    Prefers CHROMEDRIVER_PATH, then a chromedriver on PATH, and only falls
+    back to webdriver-manager (which may hit the network) if neither exists.
+    """
+    if config.CHROMEDRIVER_PATH:
+        return config.CHROMEDRIVER_PATH
+    return shutil.which("chromedriver") or _ensure_selenium().ChromeDriverManager().install()
+
 
 class BrowserFetcher:
     """Fetches HTML from pages using headless Selenium."""
     
-    def __init__(self, timeout: int = 30, wait_for_content: int = 5, service_args: Optional[list] = None):
+    def __init__(self, timeout: int = 30, wait_for_content: int = 5, service_args: Optional[list] = None,
+                 max_concurrency: Optional[int] = None, wait_for_selector: Optional[str] = None,
+                 recycle_after: int = 50, max_js_heap_mb: int = 300):
         """
         Args:
             timeout: Page load timeout in seconds
-            wait_for_content: Extra time to wait for JS content to load
+            wait_for_content: Max time to wait for JS content to load
             service_args: Optional list of args for chromedriver service
+            max_concurrency: Max browsers running at once in fetch_multiple
+                (defaults to 1 on Termux, 8 on desktop)
+            wait_for_selector: Optional CSS selector that signals the listing
+                has rendered (e.g. "a[href*='/jobs/']")
+            recycle_after: Restart a pooled browser after this many fetches
+            max_js_heap_mb: Restart a pooled browser once its JS heap exceeds
+                this (shared across the pool, see _needs_recycle)
         """
         self.timeout = timeout
         self.wait_for_content = wait_for_content
         self.service_args = service_args or []
+        self.wait_for_selector = wait_for_selector
+        self.recycle_after = recycle_after
+        self.max_js_heap_mb = max_js_heap_mb
+        self._options = None
+        # Termux pins --remote-debugging-port and runs --single-process, so
+        # parallel browsers would fight over the port and the ~2GB RAM budget
+        self.max_concurrency = max_concurrency or (1 if _is_termux() else 8)
+        
+        # Warm drivers waiting to be reused; each fetch checks one out so
+        # parallel workers never share a driver
+        self._idle_drivers: queue.Queue = queue.Queue()
+        self._all_drivers: list = []
+        self._fetch_counts: dict[int, int] = {}
+        self._drivers_lock = threading.Lock()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _get_options(self):
+        """Build Chrome options once; they are identical for every driver."""
+        if self._options is not None:
+            return self._options
+        
+        sel = _ensure_selenium()
+        options = sel.Options()
+        options.page_load_strategy = 'none' # STOP loading as soon as connection is made (prevents rendering crashes)
+        flags = dict(BASE_CHROME_FLAGS)
+        
+        # Check if running in Termux (Android)
+        if 'com.termux' in os.environ.get('PREFIX', ''):
+            # In Termux, we must use the system-installed chromium
+            # pkg install chromium chromedriver
+            options.binary_location = "/data/data/com.termux/files/usr/bin/chromium-browser"
+            flags.update(TERMUX_CHROME_FLAGS)
+        
+        for flag, value in flags.items():
+            options.add_argument(flag if value is None else f"{flag}={value}")
+        
+        self._options = options
+        return options
     
     def _get_driver(self):
         """Create headless Chrome driver."""
-        options = Options()
-        options.add_argument("--headless") # Revert to legacy headless (lighter?)
-        options.add_argument("--no-sandbox")
-        
-        # Aggressive memory saving
-        options.add_argument("--disk-cache-size=1") 
-        options.add_argument("--media-cache-size=1")
-        
-        # Standard linux flags
-        options.add_argument("--disable-gpu")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--window-size=800,600") # Smaller window = less RAM
-        options.page_load_strategy = 'none' # STOP loading as soon as connection is made (prevents rendering crashes)
-        options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        sel = _ensure_selenium()
+        options = self._get_options()
         
         # Check if running in Termux (Android)
-        if hasattr(os, 'environ') and 'PREFIX' in os.environ and 'com.termux' in os.environ.get('PREFIX', ''):
+        if 'com.termux' in os.environ.get('PREFIX', ''):
             logger.info("Termux environment detected. Using system chromedriver.")
             
             # CRITICAL FIX: Kill DBus attempts which cause crashes/hangs
             os.environ['DBUS_SESSION_BUS_ADDRESS'] = '/dev/null'
             
-            # In Termux, we must use the system-installed chromedriver
-            # pkg install chromium chromedriver
-            options.binary_location = "/data/data/com.termux/files/usr/bin/chromium-browser"
-            
-            # Specific flags for Termux/Android
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--remote-debugging-port=9222")
-            # Memory saving flags - CRITICAL for Termux
-            options.add_argument("--disable-features=site-per-process")
-            options.add_argument("--disable-site-isolation-trials")
-            options.add_argument("--disable-breakpad")
-            options.add_argument("--disable-sync")
-            options.add_argument("--disable-cloud-import")
-            options.add_argument("--disable-gpu-compositing")
-            options.add_argument("--disable-accelerated-2d-canvas")
-            options.add_argument("--enable-features=NetworkServiceInProcess")
-            options.add_argument("--blink-settings=imagesEnabled=false") # Save memory
-            
-            # CLAUDE RECOMMENDATION: Evasion of Phantom Process Killer
-            options.add_argument("--single-process") # The Big One
-            options.add_argument("--in-process-gpu")
-            options.add_argument("--renderer-process-limit=1")
-            options.add_argument("--enable-low-end-device-mode")
-            
-            # NUCLEAR OPTION: OTA (Over The Air) & Background updates disabled
-            options.add_argument("--disable-breakpad")
-            options.add_argument("--disable-client-side-phishing-detection")
-            options.add_argument("--disable-component-extensions-with-background-pages")
-            options.add_argument("--disable-default-apps")
-            options.add_argument("--disable-extensions")
-            options.add_argument("--disable-background-networking")
-            
-            # CRITICAL MEMORY SAVERS: Disable Site Isolation (huge RAM saver)
-            options.add_argument("--disable-site-isolation-trials")
-            options.add_argument("--disable-features=IsolateOrigins,site-per-process")
-            
-            # Use Mobile User Agent to get lighter pages
-            mobile_ua = "Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36"
-            options.add_argument(f"user-agent={mobile_ua}")
-            
             # Explicitly find chromedriver path
             chromedriver_path = shutil.which("chromedriver") or "/data/data/com.termux/files/usr/bin/chromedriver"
             logger.info(f"Termux: Using chromedriver at {chromedriver_path}")
@@ -113,20 +250,174 @@ class BrowserFetcher:
             if not os.path.exists(chromedriver_path):
                 logger.error(f"Chromedriver NOT FOUND at {chromedriver_path}")
             
-            service = Service(executable_path=chromedriver_path, service_args=self.service_args)
+            service = sel.Service(executable_path=chromedriver_path, service_args=self.service_args)
         else:
             # Standard desktop environment
-            # Auto-download and manage chromedriver
-            service = Service(ChromeDriverManager().install(), service_args=self.service_args)
+            # Use configured/system chromedriver, else auto-download one
+            service = sel.Service(_chromedriver_path(), service_args=self.service_args)
             
-        return webdriver.Chrome(service=service, options=options)
+        driver = sel.webdriver.Chrome(service=service, options=options)
+        driver.set_page_load_timeout(self.timeout)
+        driver.set_script_timeout(self.timeout)
+        
+        # Block images/fonts/media/CSS at the network layer (desktop only;
+        # Termux already disables images via blink settings)
+        if not _is_termux():
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+            except Exception as e:
+                logger.warning(f"Could not enable resource blocking: {e}")
+        
+        return driver
+    
+    def _acquire_driver(self):
+        """Check out a warm driver from the pool, starting one if none is idle."""
+        try:
+            return self._idle_drivers.get_nowait()
+        except queue.Empty:
+            driver = self._get_driver()
+            with self._drivers_lock:
+                self._all_drivers.append(driver)
+            return driver
+    
+    def _needs_recycle(self, driver) -> bool:
+        """
+        Check whether a pooled driver should be restarted to bound memory.
+        
+        Long-running headless Chrome grows steadily, so drivers are recycled
+        after recycle_after fetches or once the JS heap passes the limit.
+        With K drivers the per-driver heap limit shrinks as 1/sqrt(K).
+        """
+        with self._drivers_lock:
+            count = self._fetch_counts.get(id(driver), 0) + 1
+            self._fetch_counts[id(driver)] = count
+            pool_size = len(self._all_drivers)
+        
+        if count >= self.recycle_after:
+            logger.debug(f"Recycling browser after {count} fetches")
+            return True
+        if _is_termux():
+            return False
+        
+        try:
+            used = driver.execute_script(
+                "return performance.memory ? performance.memory.usedJSHeapSize : 0"
+            )
+        except Exception:
+            return False
+        limit = self.max_js_heap_mb * 1024 * 1024 / math.sqrt(max(1, pool_size))
+        if used > limit:
+            logger.debug(f"Recycling browser with {used / 1024 / 1024:.0f}MB JS heap")
+            return True
+        return False
+    
+    def _release_driver(self, driver):
+        """Reset a driver's page state and return it to the pool."""
+        if self._needs_recycle(driver):
+            self._discard_driver(driver)
+            return
+        try:
+            # Drop cookies and the old DOM so pages don't leak into each other.
+            # delete_all_cookies() only covers the current domain; redirects,
+            # SSO and third-party frames set cookies elsewhere, so clear the
+            # whole cookie jar plus the page origin's storage over CDP
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            origin = driver.execute_script("return location.origin")
+            if origin and origin != "null":
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                    "origin": origin,
+                    "storageTypes": "all",
+                })
+            driver.get("about:blank")
+        except Exception as e:
+            logger.warning(f"Discarding browser that failed to reset: {e}")
+            self._discard_driver(driver)
+            return
+        self._idle_drivers.put(driver)
+    
+    def _discard_driver(self, driver):
+        """Quit a driver and forget about it."""
+        with self._drivers_lock:
+            if driver in self._all_drivers:
+                self._all_drivers.remove(driver)
+            self._fetch_counts.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    
+    def close(self):
+        """Quit all pooled browsers. Call at shutdown."""
+        with self._drivers_lock:
+            drivers, self._all_drivers = self._all_drivers, []
+            self._fetch_counts.clear()
+        while True:
+            try:
+                self._idle_drivers.get_nowait()
+            except queue.Empty:
+                break
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+    
+    def _wait_for_dom_settled(self, driver, timeout: float, quiet_period: float = 0.5):
+        """Wait until the DOM stops growing for quiet_period seconds (capped at timeout)."""
+        deadline = time.monotonic() + timeout
+        last_count = -1
+        stable_since = time.monotonic()
+        while time.monotonic() < deadline:
+            count = driver.execute_script("return document.getElementsByTagName('*').length")
+            now = time.monotonic()
+            if count != last_count:
+                last_count, stable_since = count, now
+            elif now - stable_since >= quiet_period:
+                return
+            time.sleep(0.1)
+    
+    def _wait_for_page(self, driver):
+        """
+        Wait for the page to be ready instead of sleeping a fixed time.
+        
+        Waits for wait_for_selector (or document.readyState == 'complete'),
+        then for client-side rendering to settle, all capped at
+        wait_for_content seconds. Remaining loads (ads, trackers) are then
+        stopped so they can't hold up page_source.
+        """
+        sel = _ensure_selenium()
+        deadline = time.monotonic() + self.wait_for_content
+        if self.wait_for_selector:
+            condition = sel.EC.presence_of_element_located((sel.By.CSS_SELECTOR, self.wait_for_selector))
+        else:
+            condition = lambda d: d.execute_script("return document.readyState") == "complete"
+        
+        try:
+            sel.WebDriverWait(driver, self.wait_for_content, poll_frequency=0.2).until(condition)
+        except sel.TimeoutException:
+            logger.debug(f"Page not ready after {self.wait_for_content}s, using what has loaded")
+        
+        self._wait_for_dom_settled(driver, timeout=max(0.0, deadline - time.monotonic()))
+        
+        try:
+            driver.execute_cdp_cmd("Page.stopLoading", {})
+        except Exception:
+            pass
+    
+    def _auto_scroll(self, driver, max_rounds: int = 10, quiet_ms: int = 500):
+        """Scroll until lazy-loaded content stops appearing."""
+        rounds = driver.execute_async_script(AUTO_SCROLL_JS, max_rounds, quiet_ms)
+        logger.debug(f"Auto-scroll finished after {rounds} rounds")
     
-    def fetch(self, url: str) -> Optional[str]:
+    def fetch(self, url: str, scroll: bool = False) -> Optional[str]:
         """
         Fetch HTML from a URL using headless Chrome.
         
         Args:
             url: The URL to fetch
+            scroll: Scroll until the page stops growing, for sites that
+                lazy-load listings (skipped by default)
             
         Returns:
             Full HTML content after JavaScript execution, or None if failed
@@ -135,19 +426,17 @@ class BrowserFetcher:
             logger.error("Selenium not installed. Run: pip install selenium webdriver-manager")
             return None
         
+        sel = _ensure_selenium()
         driver = None
+        healthy = False
         try:
             logger.debug(f"Loading {url} with headless browser...")
-            driver = self._get_driver()
-            driver.set_page_load_timeout(self.timeout)
+            driver = self._acquire_driver()
             
             # Navigate to page
             # Navigation
             driver.get(url)
             
-            # Wait for content
-            time.sleep(self.wait_for_content)
-            
             # CRITICAL: On Termux, avoid complex interactions/scrolling as they crash the renderer
             is_termux = False
             try:
@@ -157,23 +446,28 @@ class BrowserFetcher:
                 pass
 
             if not is_termux:
-                # Scroll to bottom to trigger lazy loading (Desktop only)
-                try:
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight)")
-                    time.sleep(2)
-                except Exception as e:
-                    logger.warning(f"Could not scroll: {e}")
+                # Wait for content
+                self._wait_for_page(driver)
+                
+                # Scroll to trigger lazy loading (Desktop only, lazy sites only)
+                if scroll:
+                    try:
+                        self._auto_scroll(driver)
+                    except Exception as e:
+                        logger.warning(f"Could not scroll: {e}")
             else:
                 logger.info("Termux detected: Skipping scroll/JS to prevent crash.")
-                time.sleep(2) # Just wait a bit for eager load
+                # Readiness polling runs JS too, so keep the fixed waits here
+                time.sleep(self.wait_for_content + 2)
             
-            # Get full HTML
-            html = driver.page_source
+            # Get the page's HTML (pre-stripped in the browser on desktop)
+            html = driver.page_source if is_termux else self._extract_html(driver)
             
             logger.info(f"Fetched {len(html)} bytes from {url}")
+            healthy = True
             return html
             
-        except TimeoutException:
+        except sel.TimeoutException:
             logger.error(f"Timeout loading {url}")
             return None
         except Exception as e:
@@ -181,15 +475,45 @@ class BrowserFetcher:
             return None
         finally:
             if driver:
-                driver.quit()
+                # A driver that errored may be wedged; don't hand it out again
+                if healthy:
+                    self._release_driver(driver)
+                else:
+                    self._discard_driver(driver)
     
-    def fetch_multiple(self, urls: list[str]) -> dict[str, Optional[str]]:
-        """Fetch HTML from multiple URLs."""
-        results = {}
-        for url in urls:
-            results[url] = self.fetch(url)
-        return results
+    def _extract_html(self, driver) -> str:
+        """Serialize the page minus scripts/styles/comments, falling back to page_source."""
+        try:
+            html = driver.execute_script(EXTRACT_HTML_JS)
+            if html:
+                return html
+        except Exception as e:
+            logger.debug(f"In-page HTML extraction failed, using page_source: {e}")
+        return driver.page_source
+    
+    def fetch_multiple(self, urls: list[str], max_concurrency: Optional[int] = None) -> dict[str, Optional[str]]:
+        """
+        Fetch HTML from multiple URLs in parallel.
+        
+        Page loads are I/O-bound (network + renderer wait), so each worker
+        thread drives its own headless browser.
+        
+        Args:
+            urls: List of URLs to fetch
+            max_concurrency: Override for the number of browsers run at once
+            
+        Returns:
+            Dictionary mapping URL to HTML content (or None if failed)
+        """
+        workers = min(len(urls), max_concurrency or self.max_concurrency)
+        if workers <= 1:
+            return {url: self.fetch(url) for url in urls}
+        
+        logger.info(f"Fetching {len(urls)} URLs with {workers} parallel browsers")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(urls, executor.map(self.fetch, urls)))
 
 
 # Default browser fetcher instance
 browser_fetcher = BrowserFetcher()
+atexit.register(browser_fetcher.close)
@@ -22,14 +22,15 @@ for s in sources:
     print(f"      Last checked: {s['last_checked']}")
     print()
 
-# Actual job counts
+# Actual job counts (one aggregate query instead of one LIKE scan per source)
 print("\n🔍 Actual jobs in database per source:")
 print("-" * 60)
+counts_by_url = dict(conn.execute(
+    'SELECT source_url, COUNT(*) FROM jobs GROUP BY source_url'
+).fetchall())
 for s in sources:
-    actual_count = conn.execute(
-        'SELECT COUNT(*) FROM jobs WHERE source_url LIKE ?',
-        (f"%{s['url']}%",)
-    ).fetchone()[0]
+    # Case-insensitive, like the LIKE scan it replaced
+    actual_count = sum(n for url, n in counts_by_url.items() if url and s['url'].lower() in url.lower())
     
     stored_count = s['job_count']
     status = "✅ MATCH" if actual_count == stored_count else "❌ MISMATCH"
@@ -5,6 +5,7 @@ Loads settings from environment variables and .env file.
 
 import os
 import json
+from functools import cached_property
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -49,20 +50,28 @@ class Config:
     # Default fetch mode: if True, all simple JOB_URLS use browser by default
     DEFAULT_USE_BROWSER: bool = os.getenv("DEFAULT_USE_BROWSER", "false").lower() == "true"
     
-    @property
-    def job_urls(self) -> list[str]:
+    # Optional explicit chromedriver binary (skips webdriver-manager lookups)
+    CHROMEDRIVER_PATH: str = os.getenv("CHROMEDRIVER_PATH", "")
+    
+    # Env vars don't change at runtime, so the source lists are parsed once
+    # (on first access) and kept as immutable tuples; see reload()
+    
+    @cached_property
+    def job_urls(self) -> tuple[str, ...]:
         """Get simple URL list (for backwards compatibility)."""
         urls_str = os.getenv("JOB_URLS", "")
-        return [url.strip() for url in urls_str.split(",") if url.strip()]
+        return tuple(url.strip() for url in urls_str.split(",") if url.strip())
     
-    @property
-    def job_sources(self) -> list[dict]:
+    @cached_property
+    def job_sources(self) -> tuple:
         """
         Get job sources with full configuration.
         
-        Returns list of dicts with keys: url, name, requires_browser
+        Returns tuple of JobSource with fields: url, name, requires_browser, lazy_load
         Supports both simple JOB_URLS and enhanced JOB_SOURCES format.
         """
+        # Deferred: importing unified_fetcher at module load would drag the
+        # whole fetcher stack into every `import config`. Runs once per process.
         from unified_fetcher import JobSource
         
         sources = []
@@ -76,7 +85,8 @@ class Config:
                     sources.append(JobSource(
                         url=item.get("url", ""),
                         name=item.get("name", ""),
-                        requires_browser=item.get("requires_browser", False)
+                        requires_browser=item.get("requires_browser", False),
+                        lazy_load=item.get("lazy_load", False)
                     ))
             except json.JSONDecodeError as e:
                 print(f"[Config] Warning: Invalid JOB_SOURCES JSON: {e}")
@@ -89,7 +99,15 @@ class Config:
                     requires_browser=self.DEFAULT_USE_BROWSER
                 ))
         
-        return sources
+        return tuple(sources)
+    
+    def reload(self):
+        """Drop the parsed source lists so the next access re-reads the environment."""
+        for name in ("job_urls", "job_sources"):
+            self.__dict__.pop(name, None)
+    
+    # Run Gemini's separate verification pass in Parser.parse (two calls per page)
+    DOUBLE_CHECK: bool = os.getenv("DOUBLE_CHECK", "false").lower() == "true"
     
     # Scheduling
     CHECK_INTERVAL_HOURS: int = int(os.getenv("CHECK_INTERVAL_HOURS", "6"))
@@ -97,6 +115,9 @@ class Config:
     # Database
     DB_PATH: Path = Path(__file__).parent / "jobs.db"
     
+    # Seconds a cached Gemini response stays valid (default 7 days)
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+    
     def validate(self) -> list[str]:
         """Validate configuration and return list of errors."""
         errors = []
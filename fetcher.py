@@ -3,10 +3,18 @@ HTML Fetcher module for Job Pipeline Tracker.
 Fetches job pages with proper headers and retry logic.
 """
 
+import gzip
+import sqlite3
 import time
+import threading
 import requests
 import os
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+from urllib.parse import urlsplit
+from config import config
 from logger import get_logger
 
 logger = get_logger(__name__)
@@ -30,13 +38,51 @@ class Fetcher:
         "Sec-Fetch-User": "?1"
     }
     
-    def __init__(self, timeout: int = 30, max_retries: int = 3, delay_between_requests: float = 2.0):
+    # Content types worth handing to the parser
+    HTML_CONTENT_TYPES = ("text/", "application/xhtml+xml", "application/xml")
+    
+    # Cached bodies older than this are evicted (checked at most once per
+    # CACHE_PRUNE_INTERVAL seconds), so detail pages don't pile up in jobs.db
+    CACHE_TTL_DAYS = 7
+    CACHE_PRUNE_INTERVAL = 3600
+    
+    def __init__(self, timeout: int = 30, max_retries: int = 3, delay_between_requests: float = 2.0,
+                 max_concurrency: int = 10, per_host: int = 4, max_bytes: int = 5_000_000,
+                 cache_path: Optional[Path] = None, connect_timeout: float = 5.0):
         self.timeout = timeout
+        # Unreachable hosts fail (and get retried) after connect_timeout
+        # instead of tying up a worker for the full read timeout
+        self.connect_timeout = min(connect_timeout, timeout)
         self.max_retries = max_retries
         self.delay = delay_between_requests
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.max_bytes = max_bytes
         self.session = requests.Session()
         self.session.headers.update(self.DEFAULT_HEADERS)
         
+        # Keep-alive pool big enough that concurrent workers reuse
+        # connections (and TLS sessions) instead of opening new ones
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=max(max_concurrency, 10))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Per-host slots: different domains are fetched in parallel, and at
+        # most per_host requests to one domain are in flight (their start
+        # times are still spaced out by the delay, see _wait_for_host)
+        self._host_slots: dict[str, threading.Semaphore] = {}
+        self._host_locks_guard = threading.Lock()
+        
+        # Earliest time (monotonic) the next request to each host may start
+        self._next_request_at: dict[str, float] = {}
+        
+        # Conditional GET cache (ETag / Last-Modified + gzipped body),
+        # kept in its own table inside jobs.db and opened on first use
+        self.cache_path = cache_path or config.DB_PATH
+        self._cache_conn: Optional[sqlite3.Connection] = None
+        self._cache_lock = threading.Lock()
+        self._next_cache_prune = 0.0  # monotonic; 0 prunes on the first write
+        
         # Termux SSL Certificate Fix
         # Requests often fails to find the certs on Termux, so we point it explicitly
         if os.path.exists("/data/data/com.termux/files/usr/etc/tls/cert.pem"):
@@ -57,18 +103,42 @@ class Fetcher:
         if "[" in url and "%5B" not in url:
             url = url.replace("[", "%5B").replace("]", "%5D")
             
+        last_error = None
         for attempt in range(self.max_retries):
             try:
-                response = self.session.get(url, timeout=self.timeout)
-                response.raise_for_status()
+                # Rate limiting - be nice to servers (per host, not global)
+                self._wait_for_host(url)
                 
-                # Rate limiting - be nice to servers
-                time.sleep(self.delay)
+                cached = self._get_cached(url)
+                headers = {}
+                if cached:
+                    etag, last_modified, _ = cached
+                    if etag:
+                        headers["If-None-Match"] = etag
+                    if last_modified:
+                        headers["If-Modified-Since"] = last_modified
                 
-                return response.text
+                with self.session.get(url, headers=headers, timeout=(self.connect_timeout, self.timeout),
+                                      stream=True) as response:
+                    if response.status_code == 304 and cached:
+                        logger.debug(f"Not modified, using cached body: {url}")
+                        return gzip.decompress(cached[2]).decode("utf-8")
+                    
+                    response.raise_for_status()
+                    
+                    content_type = response.headers.get("Content-Type", "")
+                    if content_type and not content_type.startswith(self.HTML_CONTENT_TYPES):
+                        logger.warning(f"Skipping {url}: not an HTML page ({content_type})")
+                        return None
+                    
+                    html = self._read_body(response)
+                    self._store_cached(url, response, html)
+                    return html
                 
             except requests.RequestException as e:
-                logger.warning(f"Attempt {attempt + 1}/{self.max_retries} failed for {url}: {e}")
+                last_error = e
+                # Only the final failure is logged as an error (below)
+                logger.debug(f"Attempt {attempt + 1}/{self.max_retries} failed for {url}: {e}")
                 
                 if attempt < self.max_retries - 1:
                     # Exponential backoff
@@ -76,23 +146,126 @@ class Fetcher:
                     logger.debug(f"Retrying in {wait_time:.1f} seconds...")
                     time.sleep(wait_time)
         
-        logger.error(f"Failed to fetch {url} after {self.max_retries} attempts")
+        logger.error(f"Failed to fetch {url} after {self.max_retries} attempts: {last_error}")
         return None
     
-    def fetch_multiple(self, urls: list[str]) -> dict[str, Optional[str]]:
+    def _read_body(self, response: requests.Response) -> str:
+        """Read at most max_bytes of a streamed response and decode it once."""
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=65536):
+            body += chunk
+            if len(body) >= self.max_bytes:
+                logger.warning(f"Truncated {response.url} at {self.max_bytes} bytes")
+                del body[self.max_bytes:]
+                break
+        
+        try:
+            return body.decode(response.encoding or "utf-8", errors="replace")
+        except LookupError:
+            return body.decode("utf-8", errors="replace")
+    
+    def _get_cache_conn(self) -> sqlite3.Connection:
+        """Open the HTTP cache connection and table on first use (call with _cache_lock held)."""
+        if self._cache_conn is None:
+            conn = sqlite3.connect(self.cache_path, timeout=30, check_same_thread=False)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body BLOB NOT NULL,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+            self._cache_conn = conn
+        return self._cache_conn
+    
+    def _get_cached(self, url: str) -> Optional[tuple]:
+        """Return (etag, last_modified, gzipped_body) for a URL, or None."""
+        try:
+            with self._cache_lock:
+                return self._get_cache_conn().execute(
+                    "SELECT etag, last_modified, body FROM http_cache WHERE url = ?", (url,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"HTTP cache lookup failed for {url}: {e}")
+            return None
+    
+    def _store_cached(self, url: str, response: requests.Response, html: str):
+        """Remember the body and validators of a 200 response for the next conditional GET."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return  # Server gave us nothing to revalidate with
+        
+        body = gzip.compress(html.encode("utf-8"), compresslevel=1)
+        try:
+            with self._cache_lock:
+                conn = self._get_cache_conn()
+                conn.execute("""
+                    INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, fetched_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (url, etag, last_modified, body))
+                if time.monotonic() >= self._next_cache_prune:
+                    self._prune_cache(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.debug(f"HTTP cache write failed for {url}: {e}")
+    
+    def _prune_cache(self, conn: sqlite3.Connection):
+        """Drop cache entries older than CACHE_TTL_DAYS (call with _cache_lock held)."""
+        self._next_cache_prune = time.monotonic() + self.CACHE_PRUNE_INTERVAL
+        deleted = conn.execute(
+            "DELETE FROM http_cache WHERE fetched_at < datetime('now', ?)",
+            (f"-{self.CACHE_TTL_DAYS} days",)
+        ).rowcount
+        if deleted:
+            logger.debug(f"Evicted {deleted} stale HTTP cache entries")
+    
+    def _wait_for_host(self, url: str):
+        """Sleep until the host's politeness delay has passed and reserve the next slot."""
+        host = urlsplit(url).netloc
+        with self._host_locks_guard:
+            now = time.monotonic()
+            ready_at = max(now, self._next_request_at.get(host, 0.0))
+            self._next_request_at[host] = ready_at + self.delay
+        
+        if ready_at > now:
+            time.sleep(ready_at - now)
+    
+    def _host_slot(self, url: str) -> threading.Semaphore:
+        """Get the semaphore that caps concurrent requests to the URL's host."""
+        host = urlsplit(url).netloc
+        with self._host_locks_guard:
+            return self._host_slots.setdefault(host, threading.Semaphore(self.per_host))
+    
+    def _fetch_polite(self, url: str) -> Optional[str]:
+        """Fetch a URL while holding one of its host's slots."""
+        with self._host_slot(url):
+            return self.fetch(url)
+    
+    def fetch_multiple(self, urls: list[str], max_concurrency: Optional[int] = None) -> dict[str, Optional[str]]:
         """
-        Fetch HTML from multiple URLs.
+        Fetch HTML from multiple URLs concurrently.
+        
+        Different hosts are fetched in parallel; at most per_host URLs on the
+        same host are in flight, and the per-request delay still spaces out
+        when each of them starts.
         
         Args:
             urls: List of URLs to fetch
+            max_concurrency: Override for the number of worker threads
             
         Returns:
             Dictionary mapping URL to HTML content (or None if failed)
         """
-        results = {}
-        for url in urls:
-            results[url] = self.fetch(url)
-        return results
+        workers = min(len(urls), max_concurrency or self.max_concurrency)
+        if workers <= 1:
+            return {url: self.fetch(url) for url in urls}
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(urls, executor.map(self._fetch_polite, urls)))
 
 
 # Default fetcher instance
@@ -0,0 +1,90 @@
+"""
+Gemini response cache for Job Pipeline Tracker.
+Stores raw model output in SQLite, keyed by a hash of the prompt.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from config import config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LLMCache:
+    """Persistent prompt -> response cache with expiry (lives in jobs.db)."""
+
+    def __init__(self, db_path: Optional[Path] = None, ttl: Optional[int] = None):
+        self.db_path = db_path or config.DB_PATH
+        self.ttl = config.LLM_CACHE_TTL if ttl is None else ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """Open the connection and table on first use, dropping expired rows (call with _lock held)."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs_llm_cache (
+                    hash TEXT PRIMARY KEY,
+                    model TEXT,
+                    version TEXT,
+                    response TEXT NOT NULL,
+                    expires_at INTEGER NOT NULL
+                )
+            """)
+            conn.execute("DELETE FROM jobs_llm_cache WHERE expires_at < ?", (int(time.time()),))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Hash identifying the prompt
+
+        Returns:
+            The raw response text, or None if missing or expired
+        """
+        try:
+            with self._lock:
+                row = self._get_conn().execute(
+                    "SELECT response FROM jobs_llm_cache WHERE hash = ? AND expires_at >= ?",
+                    (key, int(time.time()))
+                ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.debug(f"LLM cache lookup failed: {e}")
+            return None
+
+    def set(self, key: str, response: str, model: str = "", version: str = "", ttl: Optional[int] = None):
+        """
+        Store a response.
+
+        Args:
+            key: Hash identifying the prompt
+            response: Raw response text
+            model: Model id the response came from
+            version: Prompt version the response was produced with
+            ttl: Seconds to keep it (defaults to LLM_CACHE_TTL)
+        """
+        expires_at = int(time.time()) + (self.ttl if ttl is None else ttl)
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                conn.execute("""
+                    INSERT OR REPLACE INTO jobs_llm_cache (hash, model, version, response, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (key, model, version, response, expires_at))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.debug(f"LLM cache write failed: {e}")
+
+
+# Default cache instance
+llm_cache = LLMCache()
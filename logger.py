@@ -3,11 +3,27 @@ Logging configuration for Job Pipeline Tracker.
 Provides centralized logging with file rotation and console output.
 """
 
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+import queue
+import re
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 from pathlib import Path
-from datetime import datetime
+from typing import Optional
+
+
+# Accepted level names for LOG_LEVEL / CONSOLE_LOG_LEVEL
+_LEVELS = {name: getattr(logging, name) for name in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")}
+
+
+def _parse_level(name: str) -> int:
+    """Map a level name to its logging constant, rejecting anything else."""
+    try:
+        return _LEVELS[name.upper()]
+    except KeyError:
+        raise ValueError(f"Invalid log level {name!r}; expected one of {', '.join(_LEVELS)}") from None
 
 
 class ColoredFormatter(logging.Formatter):
@@ -23,13 +39,84 @@ class ColoredFormatter(logging.Formatter):
         'RESET': '\033[0m'
     }
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Colored level names, built once instead of per record
+        self._colored = {
+            level: f"{color}{level}{self.COLORS['RESET']}"
+            for level, color in self.COLORS.items() if level != 'RESET'
+        }
+    
     def format(self, record):
-        # Add color to levelname
-        if record.levelname in self.COLORS:
-            record.levelname = (
-                f"{self.COLORS[record.levelname]}{record.levelname}{self.COLORS['RESET']}"
-            )
-        return super().format(record)
+        # Color the levelname for this handler only; the same record is
+        # shared with the file handlers, so put the original back
+        levelname = record.levelname
+        record.levelname = self._colored.get(levelname, levelname)
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = levelname
+
+
+class BufferedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    Daily-rotating file handler that batches writes.
+    
+    Records go into a 64KB buffer instead of being flushed one by one;
+    the buffer is flushed on ERROR and above, every flush_interval
+    seconds, on rollover and at shutdown. Rotated files are named
+    <name>.log.YYYYMMDD.
+    """
+    
+    def __init__(self, *args, buffer_size: int = 65536, flush_interval: float = 30.0, **kwargs):
+        self.buffer_size = buffer_size
+        super().__init__(*args, **kwargs)
+        # Daily date suffix; extMatch must agree so old backups get pruned
+        self.suffix = "%Y%m%d"
+        self.extMatch = re.compile(r"^\d{8}(\.\w+)?$", re.ASCII)
+        self._stop_flusher = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, args=(flush_interval,),
+            name="log-flusher", daemon=True
+        )
+        self._flusher.start()
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+    
+    def emit(self, record):
+        # Same as the parent, minus the flush after every record
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+    
+    def _flush_periodically(self, interval: float):
+        while not self._stop_flusher.wait(interval):
+            self.flush()
+    
+    def close(self):
+        self._stop_flusher.set()
+        super().close()
+
+
+# Background thread that feeds queued records to the real handlers
+_listener: Optional[QueueListener] = None
+
+
+def _stop_listener():
+    """Drain queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def setup_logging(
@@ -58,28 +145,28 @@ def setup_logging(
     logger.setLevel(logging.DEBUG)  # Capture everything, handlers will filter
     
     # Remove existing handlers to avoid duplicates
+    _stop_listener()
     logger.handlers.clear()
     
-    # File handler - Daily rotation
-    log_file = log_path / f"job_pipeline_{datetime.now().strftime('%Y%m%d')}.log"
-    file_handler = TimedRotatingFileHandler(
+    # File handler - Daily rotation (the handler appends the date on rollover)
+    log_file = log_path / "job_pipeline.log"
+    file_handler = BufferedTimedRotatingFileHandler(
         log_file,
         when='midnight',
         interval=1,
         backupCount=backup_count,
         encoding='utf-8'
     )
-    file_handler.setLevel(getattr(logging, log_level.upper()))
+    file_handler.setLevel(_parse_level(log_level))
     file_formatter = logging.Formatter(
         '%(asctime)s | %(name)-20s | %(levelname)-8s | %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
     
     # Console handler - With colors
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(getattr(logging, console_level.upper()))
+    console_handler.setLevel(_parse_level(console_level))
     
     # Use colored formatter for console (if terminal supports it)
     if os.name != 'nt' or 'ANSICON' in os.environ or 'WT_SESSION' in os.environ:
@@ -94,11 +181,10 @@ def setup_logging(
             datefmt='%H:%M:%S'
         )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
     
     # Error log file - Separate file for errors only
-    error_file = log_path / f"errors_{datetime.now().strftime('%Y%m%d')}.log"
-    error_handler = TimedRotatingFileHandler(
+    error_file = log_path / "errors.log"
+    error_handler = BufferedTimedRotatingFileHandler(
         error_file,
         when='midnight',
         interval=1,
@@ -107,7 +193,17 @@ def setup_logging(
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(file_formatter)
-    logger.addHandler(error_handler)
+    
+    # Callers only enqueue records; formatting and file/console I/O
+    # happen on the listener thread
+    global _listener
+    log_queue = queue.Queue(-1)
+    _listener = QueueListener(
+        log_queue, file_handler, console_handler, error_handler,
+        respect_handler_level=True
+    )
+    _listener.start()
+    logger.addHandler(QueueHandler(log_queue))
     
     # Log startup
     logger.info("=" * 70)
@@ -133,6 +229,10 @@ def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
 
+# Flush whatever is still queued before logging shuts the handlers down
+atexit.register(_stop_listener)
+
+
 # Initialize logging on import (can be reconfigured later)
 if not logging.getLogger().handlers:
     # Default configuration from environment or defaults
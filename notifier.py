@@ -3,19 +3,19 @@ Email Notifier module for Job Pipeline Tracker.
 Supports both Resend API and SMTP for sending notifications.
 """
 
+import atexit
 import os
+import threading
+import requests
 from datetime import datetime
+from typing import Optional
 from config import config
 from logger import get_logger
 
 logger = get_logger(__name__)
 
-# Try to import resend
-try:
-    import resend
-    RESEND_AVAILABLE = True
-except ImportError:
-    RESEND_AVAILABLE = False
+# Relative job links in notifications come from Meta's careers site
+RELATIVE_URL_BASE = "https://www.metacareers.com"
 
 
 class Notifier:
@@ -28,57 +28,77 @@ class Notifier:
         self.recipient = config.EMAIL_RECIPIENT
         self.smtp_server = config.SMTP_SERVER
         self.smtp_port = config.SMTP_PORT
+        # Logged-in SMTP connection, reused across sends
+        self._smtp = None
+        self._smtp_lock = threading.Lock()
+        # Keep-alive session for the Resend REST API
+        self._http: Optional[requests.Session] = None
     
-    def _create_email_html(self, jobs: list[dict]) -> str:
-        """Create HTML email content for job notifications."""
-        job_rows = ""
-        for job in jobs:
-            url = job.get("url", "")
-            # Make relative URLs absolute for Meta
-            if url and url.startswith("/"):
-                url = f"https://www.metacareers.com{url}"
-            title_html = f'<a href="{url}">{job.get("title", "Unknown")}</a>' if url else job.get("title", "Unknown")
-            
-            job_rows += f'''
-            <tr>
-                <td style="padding: 12px; border-bottom: 1px solid #eee;">
-                    <strong>{title_html}</strong><br>
-                    <span style="color: #666;">{job.get("company", "Unknown")} • {job.get("location", "Not specified")}</span>
-                </td>
-            </tr>
-            '''
-        
-        html = f'''
+    # Static scaffolding of the HTML email, built once; only the header
+    # line, job rows and timestamp change between notifications
+    _HEAD_TMPL = '''
         <!DOCTYPE html>
         <html>
         <head>
             <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                h1 {{ color: #2563eb; border-bottom: 2px solid #2563eb; padding-bottom: 10px; }}
-                .job-table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
-                .footer {{ margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; color: #888; font-size: 12px; }}
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                h1 { color: #2563eb; border-bottom: 2px solid #2563eb; padding-bottom: 10px; }
+                .job-table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+                .footer { margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; color: #888; font-size: 12px; }
             </style>
         </head>
         <body>
             <div class="container">
-                <h1>🎯 {len(jobs)} New Job Opening{"s" if len(jobs) != 1 else ""} Found!</h1>
+                '''
+    
+    _HEADER_TMPL = '''<h1>🎯 {count} New Job Opening{plural} Found!</h1>
                 <p>The following new positions have been posted:</p>
                 
                 <table class="job-table">
-                    {job_rows}
+                    '''
+    
+    _ROW_TMPL = '''
+            <tr>
+                <td style="padding: 12px; border-bottom: 1px solid #eee;">
+                    <strong>{title_html}</strong><br>
+                    <span style="color: #666;">{company} • {location}</span>
+                </td>
+            </tr>
+            '''
+    
+    _LINK_TMPL = '<a href="{url}">{title}</a>'
+    
+    _TAIL_TMPL = '''
                 </table>
                 
                 <div class="footer">
-                    <p>Sent by Job Pipeline Tracker • {datetime.now().strftime("%Y-%m-%d %H:%M")}</p>
+                    <p>Sent by Job Pipeline Tracker • {sent_at}</p>
                 </div>
             </div>
         </body>
         </html>
         '''
-        return html
     
-    def _create_email_text(self, jobs: list[dict]) -> str:
+    def _create_email_html(self, jobs: list[dict], sent_at: Optional[str] = None) -> str:
+        """Create HTML email content for job notifications."""
+        render_row = self._ROW_TMPL.format_map
+        rows = []
+        for job in jobs:
+            url = job.get("url", "")
+            title = job.get("title", "Unknown")
+            
+            rows.append(render_row({
+                "title_html": self._LINK_TMPL.format(url=url, title=title) if url else title,
+                "company": job.get("company", "Unknown"),
+                "location": job.get("location", "Not specified"),
+            }))
+        
+        header = self._HEADER_TMPL.format(count=len(jobs), plural="s" if len(jobs) != 1 else "")
+        tail = self._TAIL_TMPL.format(sent_at=sent_at or datetime.now().strftime("%Y-%m-%d %H:%M"))
+        return "".join([self._HEAD_TMPL, header, *rows, tail])
+    
+    def _create_email_text(self, jobs: list[dict], sent_at: Optional[str] = None) -> str:
         """Create plain text email content for job notifications."""
         lines = [
             f"🎯 {len(jobs)} New Job Opening{'s' if len(jobs) != 1 else ''} Found!",
@@ -89,36 +109,39 @@ class Notifier:
         
         for i, job in enumerate(jobs, 1):
             url = job.get("url", "")
-            if url and url.startswith("/"):
-                url = f"https://www.metacareers.com{url}"
             
-            lines.append(f"{i}. {job.get('title', 'Unknown')}")
-            lines.append(f"   Company: {job.get('company', 'Unknown')}")
-            lines.append(f"   Location: {job.get('location', 'Not specified')}")
+            lines.extend([
+                f"{i}. {job.get('title', 'Unknown')}",
+                f"   Company: {job.get('company', 'Unknown')}",
+                f"   Location: {job.get('location', 'Not specified')}",
+            ])
             if url:
                 lines.append(f"   Link: {url}")
             lines.append("")
         
-        lines.append("---")
-        lines.append(f"Sent by Job Pipeline Tracker • {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+        lines.extend(["---", f"Sent by Job Pipeline Tracker • {sent_at or datetime.now().strftime('%Y-%m-%d %H:%M')}"])
         
         return "\n".join(lines)
     
+    RESEND_API_URL = "https://api.resend.com/emails"
+    
+    def _get_http(self) -> requests.Session:
+        """Return the Resend session, creating it on first use."""
+        if self._http is None:
+            self._http = requests.Session()
+            self._http.headers.update({"Authorization": f"Bearer {self.resend_api_key}"})
+        return self._http
+    
     def _send_resend(self, jobs: list[dict]) -> bool:
         """Send email using Resend API."""
-        if not RESEND_AVAILABLE:
-            logger.error("Resend not installed. Run: pip install resend")
-            return False
-        
         try:
-            resend.api_key = self.resend_api_key
-            
-            response = resend.Emails.send({
+            response = self._get_http().post(self.RESEND_API_URL, json={
                 "from": "Job Tracker <onboarding@resend.dev>",
                 "to": [self.recipient],
                 "subject": f"🎯 {len(jobs)} New Job Opening{'s' if len(jobs) != 1 else ''} Found!",
                 "html": self._create_email_html(jobs)
-            })
+            }, timeout=30)
+            response.raise_for_status()
             
             logger.info(f"Email sent via Resend to {self.recipient}")
             return True
@@ -127,6 +150,55 @@ class Notifier:
             logger.error(f"Resend failed: {e}")
             return False
     
+    def _get_smtp(self):
+        """Return a live SMTP connection, (re)connecting and logging in if needed."""
+        import smtplib
+        
+        if self._smtp is not None:
+            # Runs can be hours apart and servers drop idle sessions (often
+            # with a 421), so check the kept connection before reusing it
+            try:
+                if self._smtp.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP rejected")
+            except (smtplib.SMTPException, OSError):
+                self._drop_smtp()
+        
+        if self._smtp is None:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            try:
+                server.starttls()
+                server.login(self.sender, self.password)
+            except Exception:
+                server.close()
+                raise
+            self._smtp = server
+        return self._smtp
+    
+    def _drop_smtp(self):
+        """Forget the SMTP connection without talking to the server (call with _smtp_lock held)."""
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except OSError:
+                pass
+            self._smtp = None
+    
+    def close(self):
+        """Log out of the SMTP server and drop the Resend session."""
+        import smtplib
+        
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        
+        with self._smtp_lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except (smtplib.SMTPException, OSError):
+                    self._smtp.close()
+                self._smtp = None
+    
     def _send_smtp(self, jobs: list[dict]) -> bool:
         """Send email using SMTP."""
         import smtplib
@@ -139,21 +211,29 @@ class Notifier:
             msg["From"] = self.sender
             msg["To"] = self.recipient
             
-            text_part = MIMEText(self._create_email_text(jobs), "plain")
-            html_part = MIMEText(self._create_email_html(jobs), "html")
+            # One timestamp for both parts
+            sent_at = datetime.now().strftime("%Y-%m-%d %H:%M")
+            text_part = MIMEText(self._create_email_text(jobs, sent_at), "plain")
+            html_part = MIMEText(self._create_email_html(jobs, sent_at), "html")
             msg.attach(text_part)
             msg.attach(html_part)
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender, self.password)
-                server.send_message(msg)
+            with self._smtp_lock:
+                try:
+                    self._get_smtp().send_message(msg)
+                except (smtplib.SMTPException, OSError) as e:
+                    # Connection went bad mid-send (421, reset, ...); reconnect once
+                    logger.warning(f"SMTP send failed ({e}), reconnecting and retrying")
+                    self._drop_smtp()
+                    self._get_smtp().send_message(msg)
             
             logger.info(f"Email sent via SMTP to {self.recipient}")
             return True
             
         except Exception as e:
             logger.error(f"SMTP failed: {e}")
+            # Don't reuse a connection in an unknown state
+            self.close()
             return False
     
     def send(self, jobs: list[dict]) -> bool:
@@ -175,6 +255,12 @@ class Notifier:
             logger.error("No recipient configured")
             return False
         
+        # Make relative URLs absolute once, for every email part (copies, not the caller's dicts)
+        jobs = [
+            {**job, "url": RELATIVE_URL_BASE + job["url"]} if (job.get("url") or "").startswith("/") else job
+            for job in jobs
+        ]
+        
         # Try Resend first if API key is configured
         if self.resend_api_key:
             return self._send_resend(jobs)
@@ -189,3 +275,4 @@ class Notifier:
 
 # Default notifier instance
 notifier = Notifier()
+atexit.register(notifier.close)
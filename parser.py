@@ -4,92 +4,231 @@ Uses Gemini AI to extract structured job data from raw HTML.
 """
 
 import json
-import google.generativeai as genai
-from typing import Optional
+import math
+import re
+import hashlib
+import html as html_lib
+import itertools
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+from urllib.parse import urljoin, urlsplit
 from config import config
+from llm_cache import llm_cache
 from logger import get_logger
 
 logger = get_logger(__name__)
 
+# Optional C HTML parser: no regex backtracking on huge or malformed pages
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+# Optional faster JSON decoder for Gemini responses (its errors subclass
+# json.JSONDecodeError, so the handlers below work with either)
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Compiled once; _clean_html runs on every fetched page.
+# Scripts, styles and comments are dropped in a single scan.
+CLEAN_RE = re.compile(
+    r'<script\b[^>]*>.*?</script>|<style\b[^>]*>.*?</style>|<!--.*?-->',
+    re.DOTALL | re.IGNORECASE
+)
+COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+WS_RE = re.compile(r'\s+')
+TAG_RE = re.compile(r'<[^>]+>')
+# Parser.CHROME_TAGS blocks, for pruning oversized pages without selectolax
+CHROME_RE = re.compile(r'<(header|footer|nav|aside)\b[^>]*>.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+# Words that mark job listing content when ranking regions of oversized pages
+JOB_HINT_RE = re.compile(r'apply|posted|location|req(?:uisition)?\b|job', re.IGNORECASE)
+
+# One GenerativeModel per API key, shared by every parser. Each has its own
+# client, so keys never go through the process-wide genai.configure()
+_MODELS_BY_KEY: dict[tuple[str, str], object] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def _get_model(model_id: str, api_key: str):
+    """Return the (cached) model bound to api_key."""
+    with _MODELS_LOCK:
+        model = _MODELS_BY_KEY.get((model_id, api_key))
+        if model is None:
+            # Deferred: the SDK pulls in grpc/protobuf, only needed once we call Gemini
+            import google.generativeai as genai
+            model = genai.GenerativeModel(model_id)
+            try:
+                # Private SDK internals, checked against google-generativeai
+                # 0.8.x (pinned in requirements.txt)
+                from google.generativeai import client as genai_client
+                manager = genai_client._ClientManager()
+                manager.configure(api_key=api_key)
+                # GenerativeModel only falls back to the global client when _client is unset
+                model._client = manager.get_default_client("generative")
+            except (ImportError, AttributeError, TypeError) as e:
+                # Internals moved: fall back to the process-wide key. Models
+                # then share whichever key was configured last, so they are
+                # not cached (every key switch reconfigures)
+                logger.warning(f"Per-key Gemini clients unavailable ({e}), using genai.configure()")
+                genai.configure(api_key=api_key)
+                return model
+            _MODELS_BY_KEY[(model_id, api_key)] = model
+        return model
+
 
 class Parser:
     """Parses job listings from HTML using Gemini AI."""
     
-    EXTRACTION_PROMPT = '''You are a job listing extractor. Analyze the HTML below and extract ALL job postings you can find.
-
-STRICT INSTRUCTIONS:
-1. **MANDATORY**: A valid job posting MUST have a specific **Job Link** (URL) or **Apply Button**. If there is no specific link to the job details, IGNORE IT.
-2. **CONTEXT CHECK**: Besides the link, the job MUST have at least ONE of the following:
-   - Specific LOCATION (e.g. "Seattle, WA", "Remote")
-   - Posting DATE or STATUS (e.g. "2 days ago", "New", "Updated: 2/12/2026")
-   - "Apply" button text next to it
-   - Short Job Description snippet
-3. **EXCLUSION**: 
-   - If a text is just a Title (e.g. "Software Development") with NO specific link and NO context, it is a Category or Menu. IGNORE IT.
-   - Exclude Video titles (e.g. "Senior Program Manager" header for a video).
-4. EXTRACT TITLES EXACTLY AS THEY APPEAR.
-5. If no jobs are found, return an empty array [].
-
-For each job, extract:
-- title: The job title (EXACT MATCH)
-- company: Company name (if visible, otherwise use "Unknown")
-- location: Job location (if visible, otherwise use "Not specified")
-- url: Link to the job posting (REQUIRED - return empty string ONLY if absolutely standard text parsing fails, but generally reject jobs with no link)
-- description: Brief description or requirements snippet (first 200 chars)
+    MODEL_ID = "gemini-2.5-flash-lite"
+    # Part of the response cache key: bump whenever a prompt below changes
+    PROMPT_VERSION = "2"
+    # Longest we'll sleep for a quota'd key to come back before giving up on
+    # a request (never while holding _key_lock, never on the last attempt)
+    MAX_KEY_WAIT = 5
+    
+    # Structured output for prompts that return a list of jobs
+    JOB_LIST_SCHEMA = {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "title": {"type": "STRING"},
+                "company": {"type": "STRING"},
+                "location": {"type": "STRING"},
+                "url": {"type": "STRING"},
+                "description": {"type": "STRING"},
+            },
+            "required": ["title", "url"],
+        },
+    }
+    
+    EXTRACTION_PROMPT = '''Extract every job posting from the HTML below.
 
-Return ONLY a valid JSON array.
+Rules:
+- Required: a specific job link or apply URL, plus at least one of: location ("Seattle, WA", "Remote"), posting date/status ("2 days ago", "New"), apply button, description snippet.
+- Skip titles with no link and no context (categories, menus) and video titles.
+- Copy titles exactly as shown.
+- No jobs: return [].
+
+Fields: title (exact), company ("Unknown" if absent), location ("Not specified" if absent), url (required), description (first 200 chars).
 
-Example output:
-[
-  {"title": "Software Engineer", "company": "Google", "location": "Mountain View, CA", "url": "https://...", "description": "We are looking for..."},
-  {"title": "Data Analyst", "company": "Google", "location": "New York, NY", "url": "https://...", "description": "Join our data team..."}
-]
+Return ONLY a valid JSON array.
 
 HTML to analyze:'''
 
-    VERIFICATION_PROMPT = '''You are a Truth Verification AI. 
-I will provide you with a list of jobs extracted from the HTML below.
-Your task is to VERIFY that each job actually exists in the provided HTML.
+    # Extraction with the verification rules folded in: one call instead of two
+    COMBINED_PROMPT = EXTRACTION_PROMPT.replace("Return ONLY a valid JSON array.", '''Self-check before answering: re-read the HTML and drop any job whose title/company isn't in it, that lacks a specific link or visible context, or that is a category ("Operations", "MBA"), video title or navigation link.
 
-Rules:
-1. **LINK CHECK**: Does the job have a valid, specific URL/Apply Link extracted? 
-   - If NO link -> REMOVE IT (It's likely a category header).
-2. **CONTEXT CHECK**: Does it have a visible LOCATION, DATE, APPLY BUTTON, or DESCRIPTION in the HTML?
-   - If NO context -> REMOVE IT.
-3. Check the HTML for the specific Job Title and Company.
-4. REMOVE items that are just Categories (e.g. "Operations", "MBA"), Video Titles, or Navigation Links.
-5. Return the filtered list of valid jobs as a JSON array.
-
-Jobs to Verify:
+Return ONLY a valid JSON array.''')
+    
+    # Several small pages share one request; the answer is keyed by page URL
+    BATCH_EXTRACTION_PROMPT = EXTRACTION_PROMPT.replace("HTML to analyze:", '''MULTIPLE PAGES: The HTML below contains several pages, each starting with a line "---PAGE url=<url>---".
+Apply the rules above to each page separately. Instead of a single array, return ONLY a valid JSON object
+mapping each page url (exactly as given) to its JSON array of jobs, e.g.:
+{"https://example.com/jobs": [{"title": "...", ...}], "https://example.org/careers": []}
+
+Pages to analyze:''')
+    
+    # Pages whose cleaned HTML fits this budget (~4 chars per token) get batched
+    BATCH_CHAR_BUDGET = 120_000
+    MAX_BATCH_PAGES = 5
+    
+    # Token cap for one page's HTML. Markup never averages under
+    # MIN_CHARS_PER_TOKEN, so shorter pages skip the count_tokens call.
+    MAX_HTML_TOKENS = 250_000
+    MIN_CHARS_PER_TOKEN = 2
+    # Fallback cap when tokens can't be counted
+    MAX_HTML_CHARS = 800_000
+    # Dropped first when a page is over the size budget
+    CHROME_TAGS = ('header', 'footer', 'nav', 'aside')
+    
+    # Parsed results remembered per (source URL, cleaned HTML)
+    PARSE_CACHE_SIZE = 256
+    # Cleaned HTML remembered per raw page; pages are large, so keep it small
+    CLEAN_CACHE_SIZE = 16
+    
+    # Pages mentioning these fewer than MIN_JOB_KEYWORD_HITS times in total
+    # can't be job listings, so they never reach Gemini
+    JOB_KEYWORDS = (b"job", b"apply", b"position", b"career")
+    MIN_JOB_KEYWORD_HITS = 3
+
+    VERIFICATION_PROMPT = '''Verify the jobs below against the HTML after them. Remove any job that:
+- has no specific URL/apply link (likely a category header),
+- has no visible location, date, apply button or description in the HTML,
+- has a title/company not found in the HTML,
+- is a category ("Operations", "MBA"), video title or navigation link.
+Return the remaining jobs as a JSON array.
+
+Jobs to verify:
 {jobs_json}
 
 HTML Context:
 '''
 
-    VERIFY_PAGE_PROMPT = '''You are a Job Validator.
-I have a potential job posting for:
+    VERIFY_PAGE_PROMPT = '''Is the page below the actual job listing for this position?
 - Title: {title}
 - Company: {company}
 
-Analyze the HTML of the destination page below.
-Does this page confirm that this is indeed a job listing for the above position?
-Check for:
-- Presence of specific job description/requirements.
-- "Apply" button.
-- Title matching the one provided.
-
-If it's a login page, a generic search result list, or a "job not found" error, return FALSE.
-If it is the actual job description, return TRUE.
+Valid only with a specific description/requirements, an apply button and a matching title.
+Login pages, search result lists and "job not found" pages are invalid.
 
-Return strictly JSON: {{"valid": true, "reason": "..."}} or {{"valid": false, "reason": "..."}}
+Return JSON: {{"valid": true|false, "reason": "..."}}
 
 HTML:
 '''
 
-    def __init__(self):
+    # Batched form of VERIFY_PAGE_PROMPT (one verdict per job, in order)
+    VERIFY_PAGES_PROMPT = '''For each numbered job below, is the page that follows it the actual job listing for that position?
+
+Valid only with a specific description/requirements, an apply button and a matching title.
+Login pages, search result lists and "job not found" pages are invalid.
+
+Return a JSON array with one {"valid": true|false, "reason": "..."} per job, in the same order.
+'''
+    VERIFY_BATCH_SIZE = 5
+    # Listing entries with at least this much description, linking back to the
+    # source's own site and whose description really is on the listing page,
+    # are trusted without fetching the detail page
+    MIN_AUTHORITATIVE_DESCRIPTION = 200
+    VERDICT_LIST_SCHEMA = {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "valid": {"type": "BOOLEAN"},
+                "reason": {"type": "STRING"},
+            },
+            "required": ["valid"],
+        },
+    }
+
+    def __init__(self, max_concurrency: int = 4):
         self.model = None
         self._current_key_val = None
         self._current_key_idx = 0
+        # Pages parsed at once; Gemini calls are network-bound
+        self.max_concurrency = max_concurrency
+        # Serializes client (re)initialization across worker threads;
+        # _key_gen counts client switches so stale rotations can be detected
+        self._key_lock = threading.RLock()
+        self._key_gen = 0
+        # One parser per API key for parse_multiple, built on first use
+        self._pool: Optional[ParserPool] = None
+        # Unchanged pages skip Gemini entirely (LRU, in-process)
+        self._parse_cache: OrderedDict[bytes, list[dict]] = OrderedDict()
+        self._parse_cache_lock = threading.Lock()
+        # Unchanged raw pages skip cleaning (LRU, keyed by content hash)
+        self._clean_cache: OrderedDict[bytes, str] = OrderedDict()
+        self._clean_cache_lock = threading.Lock()
     
     def _initialize_client(self, key_idx: int = 0) -> bool:
         """
@@ -103,82 +242,254 @@ HTML:
         new_key = keys[self._current_key_idx]
         
         try:
-            genai.configure(api_key=new_key)
-            self.model = genai.GenerativeModel("gemini-2.5-flash-lite")
+            self.model = _get_model(self.MODEL_ID, new_key)
             self._current_key_val = new_key
+            self._key_gen += 1
             logger.info(f"Initialized Gemini with key #{self._current_key_idx + 1}/{len(keys)} (ending in ...{new_key[-4:]})")
             return True
         except Exception as e:
             logger.error(f"Failed to initialize key #{self._current_key_idx + 1}: {e}")
             return False
 
-    def _rotate_key(self) -> bool:
-        """Switch to the next available API key."""
+    def _rotate_key(self, seen_gen: Optional[int] = None, final: bool = False) -> bool:
+        """
+        Switch to the next available API key.
+        
+        Args:
+            seen_gen: _key_gen the caller's failed request was made with. If
+                another thread has switched clients since, that counts as
+                the rotation and no further key is burned.
+            final: The caller has no attempts left, so never wait for a
+                cooling key (returns False if none is ready)
+        """
+        with self._key_lock:
+            if seen_gen is not None and seen_gen != self._key_gen:
+                return True
+        
         keys = config.GEMINI_API_KEYS
         if not keys or len(keys) <= 1:
             logger.warning("Cannot rotate: Only one key available.")
             return False
-            
-        next_idx = self._current_key_idx + 1
-        logger.info(f"Rotating API key (from #{self._current_key_idx + 1} to #{next_idx % len(keys) + 1})...")
-        return self._initialize_client(next_idx)
+        
+        next_idx, wait = key_cooldowns.pick()
+        if wait > 0:
+            # Every key is cooling down: only wait out a short quota cooldown,
+            # and outside _key_lock so other threads aren't stuck behind us
+            if final or wait > self.MAX_KEY_WAIT:
+                logger.warning(f"All API keys cooling down (next ready in {wait:.0f}s), giving up on this request")
+                return False
+            logger.info(f"All API keys cooling down, waiting {wait:.1f}s for key #{next_idx + 1}")
+            time.sleep(wait)
+        
+        with self._key_lock:
+            if seen_gen is not None and seen_gen != self._key_gen:
+                return True
+            logger.info(f"Rotating API key (from #{self._current_key_idx + 1} to #{next_idx + 1})...")
+            return self._initialize_client(next_idx)
 
     def parse(self, html: str, source_url: str = "") -> list[dict]:
         """
         Parse HTML and extract job listings using Gemini with automatic key rotation.
-        Includes a self-correction/verification pass.
+        
+        Extraction and verification happen in a single call; set DOUBLE_CHECK=true
+        to run the separate self-correction/verification pass instead.
         """
-        # 1. Initial Extraction
-        jobs = self._generate_with_retry(self.EXTRACTION_PROMPT + "\n\n" + self._clean_html(html))
+        clean_html = self._clean_html(html)
+        if not clean_html:
+            return []
         
+        # Same finalization as parse_multiple: source_url stamped, relative
+        # links resolved, result cached for unchanged pages
+        if not config.DOUBLE_CHECK:
+            jobs = self._generate_with_retry([self.COMBINED_PROMPT, clean_html], self.JOB_LIST_SCHEMA)
+            jobs = self._finalize_jobs(jobs, source_url, clean_html)
+            logger.info(f"Extracted {len(jobs)} verified jobs")
+            return jobs
+        
+        # 1. Initial Extraction
+        jobs = self._finalize_jobs(
+            self._generate_with_retry([self.EXTRACTION_PROMPT, clean_html], self.JOB_LIST_SCHEMA),
+            source_url
+        )
         if not jobs:
             return []
-            
-        # Add source URL to initial results
-        for job in jobs:
-            job["source_url"] = source_url
 
         # 2. Verification Pass (Consensus Check)
         # Only verify if we actually found something
         logger.info(f"Initial pass found {len(jobs)} jobs. Verifying...")
-        verified_jobs = self._verify_integrity(jobs, self._clean_html(html))
-        
-        # Re-attach source URL
-        for job in verified_jobs:
-             if "source_url" not in job:
-                 job["source_url"] = source_url
-                 
+        verified_jobs = self._finalize_jobs(self._verify_integrity(jobs, clean_html), source_url, clean_html)
         logger.info(f"Verification complete. Valid jobs: {len(verified_jobs)} (Filtered: {len(jobs) - len(verified_jobs)})")
         return verified_jobs
 
     def _clean_html(self, html: str) -> str:
-        """Clean HTML for token efficiency."""
-        import re
-        html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
-        html = re.sub(r'\s+', ' ', html)
+        """Clean HTML for token efficiency (memoized for recently seen pages)."""
+        key = hashlib.sha1(html.encode("utf-8", "surrogatepass")).digest()
+        with self._clean_cache_lock:
+            clean_html = self._clean_cache.get(key)
+            if clean_html is not None:
+                self._clean_cache.move_to_end(key)
+                return clean_html
+        
+        clean_html = self._clean_html_uncached(html)
+        with self._clean_cache_lock:
+            self._clean_cache[key] = clean_html
+            while len(self._clean_cache) > self.CLEAN_CACHE_SIZE:
+                self._clean_cache.popitem(last=False)
+        return clean_html
+    
+    def _clean_html_uncached(self, html: str) -> str:
+        """Strip scripts, styles and comments, then fit the token budget."""
+        if not SELECTOLAX_AVAILABLE:
+            html = WS_RE.sub(' ', CLEAN_RE.sub('', html))
+            budget = self._char_budget(html)
+            if len(html) > budget:
+                html = CHROME_RE.sub('', html)
+            return self._truncate_at_tag(html, budget)
+        
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(['script', 'style'])
+        # Serialized comments are always closed, so this pass stays linear
+        html = WS_RE.sub(' ', COMMENT_RE.sub('', tree.html or ''))
+        # Only prune pages that are really over the token limit, and only by
+        # as much as they overshoot it
+        budget = self._char_budget(html)
+        if len(html) > budget:
+            html = self._select_job_regions(tree, budget)
+        return self._truncate_at_tag(html, budget)
+    
+    def _select_job_regions(self, tree, budget: int) -> str:
+        """
+        Shrink an oversized page to its most job-dense parts.
+        
+        Page chrome (CHROME_TAGS) goes first. If that isn't enough, body
+        subtrees are ranked by job keyword hits per character and the best
+        ones are kept, in page order, until the budget is filled.
+        """
+        tree.strip_tags(list(self.CHROME_TAGS))
+        html = WS_RE.sub(' ', COMMENT_RE.sub('', tree.html or ''))
+        if len(html) <= budget or tree.body is None:
+            return html
+        
+        # Split the body into subtrees (and loose text) that each fit the budget
+        regions = []
+        
+        def split(node):
+            for child in node.iter(include_text=True):
+                child_html = WS_RE.sub(' ', COMMENT_RE.sub('', child.html or ''))
+                if len(child_html) <= budget:
+                    if child_html.strip():
+                        regions.append(child_html)
+                elif next(child.iter(), None) is None:
+                    # Nothing left to split (text, <pre>, a text-only cell): cut it instead
+                    regions.append(self._truncate_at_tag(child_html, budget))
+                else:
+                    split(child)
+        
+        split(tree.body)
+        
+        density = [len(JOB_HINT_RE.findall(region)) / len(region) for region in regions]
+        keep = []
+        used = 0
+        for i in sorted(range(len(regions)), key=density.__getitem__, reverse=True):
+            if used + len(regions[i]) <= budget:
+                keep.append(i)
+                used += len(regions[i])
+        
+        logger.info(f"Page is {len(html)} chars, kept {len(keep)}/{len(regions)} most job-dense regions ({used} chars)")
+        return ''.join(regions[i] for i in sorted(keep))
+    
+    @staticmethod
+    def _truncate_at_tag(html: str, limit: int) -> str:
+        """Cut html to at most limit chars, never in the middle of a tag."""
+        if len(html) <= limit:
+            return html
+        # Back up to before a tag the cut would split, keeping any text before it
+        start = html.rfind('<', 0, limit)
+        end = start if start > html.rfind('>', 0, limit) else limit
+        return html[:end] if end > 0 else html[:limit]
+    
+    def _char_budget(self, html: str) -> int:
+        """
+        How many characters of html fit in MAX_HTML_TOKENS.
+        
+        len(html) when it already fits; pages too long for the cheap length
+        check get a count_tokens call, and MAX_HTML_CHARS if that fails.
+        """
+        if len(html) <= self.MAX_HTML_TOKENS * self.MIN_CHARS_PER_TOKEN:
+            return len(html)
+        
+        try:
+            with self._key_lock:
+                if self.model is None:
+                    self._initialize_client()
+            tokens = self.model.count_tokens(html).total_tokens
+        except Exception as e:
+            logger.warning(f"Token count failed ({e}), limiting by length instead")
+            return self.MAX_HTML_CHARS
         
-        max_html_length = 800000 
-        if len(html) > max_html_length:
-            html = html[:max_html_length]
-        return html
+        if tokens <= self.MAX_HTML_TOKENS:
+            return len(html)
+        # Keep the same share of characters, with a little headroom
+        keep = int(len(html) * self.MAX_HTML_TOKENS / tokens * 0.95)
+        logger.info(f"HTML is {tokens} tokens, cutting to ~{self.MAX_HTML_TOKENS} ({keep} chars)")
+        return keep
 
-    def _generate_with_retry(self, prompt: str) -> list[dict]:
+    def _generate_with_retry(self, prompt: Union[str, list[str]], schema: Optional[dict] = None) -> list[dict]:
         """
         Helper to run generation with retry logic (key rotation).
         Returns parsed list of dicts.
+        
+        Responses are requested as JSON; pass a schema to have Gemini
+        enforce the structure as well.
+        
+        Raw responses are cached by prompt hash, so an identical prompt
+        (same page, same prompt version) doesn't hit the API again.
+        
+        The prompt may be a list of parts (instructions, then page HTML); they
+        are sent as separate parts so the page is never copied into one big string.
         """
-        if self.model is None:
-            self._initialize_client()
-            
+        parts = [prompt] if isinstance(prompt, str) else prompt
+        digest = hashlib.sha256((self.MODEL_ID + self.PROMPT_VERSION).encode("utf-8"))
+        for i, part in enumerate(parts):
+            if i:
+                digest.update(b"\n\n")
+            digest.update(part.encode("utf-8", "ignore"))
+        cache_key = digest.hexdigest()
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Gemini response served from cache")
+            return self._process_response(cached)
+        
+        key_idx, wait = key_cooldowns.pick()
+        if wait > self.MAX_KEY_WAIT:
+            # Every key is cooling (or revoked): fail fast instead of burning requests
+            logger.warning(f"All API keys cooling down (next ready in {wait:.0f}s), skipping Gemini call")
+            return []
+        if wait > 0:
+            logger.info(f"All API keys cooling down, waiting {wait:.1f}s for key #{key_idx + 1}")
+            time.sleep(wait)
+        
+        with self._key_lock:
+            # Move off a key that is still cooling before sending anything on it
+            if self.model is None or (key_idx != self._current_key_idx
+                                      and key_cooldowns.is_cooling(self._current_key_idx)):
+                self._initialize_client(key_idx)
+        
         max_retries = len(config.GEMINI_API_KEYS)
         attempts = 0
         
         while attempts < max_retries:
+            with self._key_lock:
+                model, seen_gen, key_idx = self.model, self._key_gen, self._current_key_idx
             try:
-                response = self.model.generate_content(prompt)
-                return self._process_response(response)
+                generation_config = {"response_mime_type": "application/json"}
+                if schema:
+                    generation_config["response_schema"] = schema
+                response = model.generate_content(parts, generation_config=generation_config)
+                text = self._response_text(response)
+                if text.strip():
+                    llm_cache.set(cache_key, text, model=self.MODEL_ID, version=self.PROMPT_VERSION)
+                return self._process_response(text)
                 
             except Exception as e:
                 error_str = str(e).lower()
@@ -187,7 +498,8 @@ HTML:
                 
                 if is_quota_error or is_auth_error:
                     logger.warning(f"API Error (Attempt {attempts + 1}/{max_retries}): {e}")
-                    if self._rotate_key():
+                    key_cooldowns.cool(key_idx, auth=is_auth_error)
+                    if self._rotate_key(seen_gen, final=attempts + 1 >= max_retries):
                         attempts += 1
                         continue
                     else:
@@ -204,11 +516,11 @@ HTML:
         Ask the AI to self-correct and verify the jobs exist in the HTML.
         """
         try:
-            jobs_json = json.dumps(jobs, indent=2)
-            prompt = self.VERIFICATION_PROMPT.format(jobs_json=jobs_json) + "\n\n" + html_context
+            jobs_json = json.dumps(jobs, ensure_ascii=False, separators=(",", ":"))
+            prompt = [self.VERIFICATION_PROMPT.format(jobs_json=jobs_json), html_context]
             
             # Use the same retry logic for verification
-            verified_jobs = self._generate_with_retry(prompt)
+            verified_jobs = self._generate_with_retry(prompt, self.JOB_LIST_SCHEMA)
             
             # Fallback for empty return on verification (paranoid check)
             if not verified_jobs and jobs:
@@ -220,39 +532,36 @@ HTML:
             logger.error(f"Verification check failed: {e}. Returning original jobs.")
             return jobs
 
+    @staticmethod
+    def _response_text(response) -> str:
+        """Get the raw text out of a Gemini response (or pass a string through)."""
+        if isinstance(response, str):
+            return response
+        
+        text = ""
+        if isinstance(response, list):
+            # Handle potential list return from API (e.g. pagination/streaming artifacts)
+            for part in response:
+                if hasattr(part, 'text'):
+                    text += part.text
+        elif hasattr(response, 'text'):
+            text = response.text
+        return text
+
     def _process_response(self, response, source_url=""):
-        """Helper to process the raw Gemini response into job list."""
+        """Helper to process the raw Gemini response (or its text) into job list."""
+        text = ""
         try:
-            # DEBUG LOG
-            logger.info(f"Processing response type: {type(response)}")
-            
-            text = ""
-            if isinstance(response, list):
-                # Handle potential list return from API (e.g. pagination/streaming artifacts)
-                for part in response:
-                    if hasattr(part, 'text'):
-                        text += part.text
-            elif hasattr(response, 'text'):
-                text = response.text
-            
-            text = text.strip()
-            if not text:
+            # Every call requests application/json, so there are no markdown
+            # fences to strip; only a truncated response fails to decode
+            text = self._response_text(response)
+            if not text.strip():
                 return []
-
-            if text.startswith("```"):
-                parts = text.split("```")
-                if len(parts) > 1:
-                    text = parts[1]
-                    if text.startswith("json"):
-                        text = text[4:]
-                text = text.strip()
-            
-            jobs = json.loads(text)
-            return jobs
+            return _json_loads(text)
             
         except json.JSONDecodeError:
             logger.warning(f"JSON incomplete, attempting partial extraction...")
-            return self._extract_partial_json(response.text)
+            return self._extract_partial_json(text)
         except Exception as e:
             logger.error(f"Error processing response: {e}")
             return []
@@ -263,32 +572,21 @@ HTML:
             jobs = []
             start = text.find('[')
             if start != -1:
-                depth = 0
-                obj_start = None
-                i = start
-                
+                # raw_decode does the scanning in C and stops at the first
+                # object that is cut off or malformed
+                decoder = json.JSONDecoder()
+                i = start + 1
                 while i < len(text):
-                    char = text[i]
-                    if char == '{':
-                        if depth == 0: obj_start = i
-                        depth += 1
-                    elif char == '}':
-                        depth -= 1
-                        if depth == 0 and obj_start is not None:
-                            obj_str = text[obj_start:i+1]
-                            try:
-                                job = json.loads(obj_str)
-                                if 'title' in job:
-                                    jobs.append(job)
-                            except: pass
-                            obj_start = None
-                    elif char == '"':
+                    while i < len(text) and text[i] in ' \t\r\n,':
                         i += 1
-                        while i < len(text):
-                            if text[i] == '\\': i += 2; continue
-                            if text[i] == '"': break
-                            i += 1
-                    i += 1
+                    if i >= len(text) or text[i] == ']':
+                        break
+                    try:
+                        job, i = decoder.raw_decode(text, i)
+                    except ValueError:
+                        break
+                    if isinstance(job, dict) and 'title' in job:
+                        jobs.append(job)
             
             return jobs
         except Exception as e:
@@ -308,12 +606,14 @@ HTML:
         """
         if not html:
             return False
-            
-        clean_html = self._clean_html(html)
+        return self._verify_clean_page(self._clean_html(html), job)
+    
+    def _verify_clean_page(self, clean_html: str, job: dict) -> bool:
+        """verify_job_page for an already-cleaned page."""
         title = job.get('title', 'Unknown')
         company = job.get('company', 'Unknown')
         
-        prompt = self.VERIFY_PAGE_PROMPT.format(title=title, company=company) + "\n\n" + clean_html
+        prompt = [self.VERIFY_PAGE_PROMPT.format(title=title, company=company), clean_html]
         
         try:
             # Use retry logic
@@ -341,39 +641,453 @@ HTML:
             logger.error(f"Error validating job page: {e}")
             return False  # Fail safe: if we can't verify, don't add strictly? Or add loosely? User wants EXTRA layer. So fail safe = reject.
 
-    def parse_multiple(self, html_dict: dict[str, Optional[str]]) -> list[dict]:
-        """Combine lists of all jobs from all pages."""
+    @staticmethod
+    def _site(url: str) -> str:
+        """Registrable domain of a URL, approximately (careers.example.co.uk -> example.co.uk)."""
+        labels = (urlsplit(url).hostname or "").split(".")
+        # Two-letter country TLDs often sit under a generic second level (co.uk, com.au)
+        if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in ("co", "com", "org", "net", "ac", "gov", "edu"):
+            return ".".join(labels[-3:])
+        return ".".join(labels[-2:])
+    
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """Lowercase, entity-decoded, whitespace-collapsed text for substring checks."""
+        return WS_RE.sub(' ', html_lib.unescape(text)).strip().lower()
+    
+    def page_text(self, html: Optional[str]) -> str:
+        """
+        Visible text of a page as the parser saw it (after _clean_html), normalized.
+        
+        Compute it once per listing page and pass it to listing_is_authoritative.
+        """
+        if not html:
+            return ''
+        clean_html = self._clean_html(html)
+        if SELECTOLAX_AVAILABLE:
+            text = LexborHTMLParser(clean_html).text(separator=' ')
+        else:
+            text = TAG_RE.sub(' ', clean_html)
+        return self._normalize_text(text)
+    
+    def listing_is_authoritative(self, job: dict, listing_text: str) -> bool:
+        """
+        Whether the listing entry alone is enough to accept a job.
+        
+        True when the listing already carried a substantial description, that
+        description actually appears on the listing page (so it isn't the
+        model's invention), and the job URL is on the same site as the listing
+        page, so fetching and verifying the detail page would add little.
+        
+        Args:
+            job: Extracted job
+            listing_text: page_text() of the listing page the job came from
+        """
+        description = job.get('description') or ''
+        url = job.get('url') or ''
+        source_url = job.get('source_url') or ''
+        if len(description) <= self.MIN_AUTHORITATIVE_DESCRIPTION or not url or not source_url:
+            return False
+        site = self._site(url)
+        if not site or site != self._site(source_url):
+            return False
+        # A trailing ellipsis is the model marking a cut, not page text
+        description = self._normalize_text(description).rstrip('.… ')
+        return len(description) > self.MIN_AUTHORITATIVE_DESCRIPTION and description in listing_text
+    
+    def verify_job_pages(self, pages: list[tuple[Optional[str], dict]]) -> list[bool]:
+        """
+        Verify many job detail pages, VERIFY_BATCH_SIZE per Gemini request.
+        
+        Batches run concurrently across API keys, like parse_multiple.
+        
+        Args:
+            pages: (detail page HTML, job) pairs; HTML is None if the fetch failed.
+            
+        Returns:
+            One result per pair, in the same order (see verify_job_page).
+        """
+        results = [False] * len(pages)
+        pending = [(i, self._clean_html(html), job) for i, (html, job) in enumerate(pages) if html]
+        batches = [pending[i:i + self.VERIFY_BATCH_SIZE] for i in range(0, len(pending), self.VERIFY_BATCH_SIZE)]
+        workers = min(len(batches), self.max_concurrency)
+        
+        if workers <= 1:
+            verdicts = [self._verify_batch(batch) for batch in batches]
+        else:
+            pool = self._get_pool()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                verdicts = list(executor.map(lambda batch: pool.next()._verify_batch(batch), batches))
+        
+        for batch, batch_verdicts in zip(batches, verdicts):
+            for (i, _, _), valid in zip(batch, batch_verdicts):
+                results[i] = valid
+        return results
+    
+    def _verify_batch(self, batch: list[tuple[int, str, dict]]) -> list[bool]:
+        """Verify a group of cleaned detail pages with one Gemini request."""
+        if len(batch) == 1:
+            _, clean_html, job = batch[0]
+            return [self._verify_clean_page(clean_html, job)]
+        
+        prompt = [self.VERIFY_PAGES_PROMPT]
+        for n, (_, clean_html, job) in enumerate(batch, 1):
+            prompt += [f"---JOB {n}: {job.get('title', 'Unknown')} at {job.get('company', 'Unknown')}---", clean_html]
+        verdicts = self._generate_with_retry(prompt, self.VERDICT_LIST_SCHEMA)
+        
+        if not isinstance(verdicts, list) or len(verdicts) != len(batch):
+            # Can't line answers up with jobs: check each page on its own
+            logger.warning(f"Batched verification of {len(batch)} pages failed, verifying them one by one")
+            return [self._verify_clean_page(clean_html, job) for _, clean_html, job in batch]
+        
+        results = []
+        for (_, _, job), verdict in zip(batch, verdicts):
+            valid = isinstance(verdict, dict) and verdict.get("valid") is True
+            if not valid:
+                reason = verdict.get('reason', 'Unknown reason') if isinstance(verdict, dict) else 'Unknown reason'
+                logger.warning(f"Job validation failed for '{job.get('title', 'Unknown')}': {reason}")
+            results.append(valid)
+        return results
+
+    def parse_multiple(self, html_dict: dict[str, Optional[str]],
+                       max_concurrency: Optional[int] = None) -> list[dict]:
+        """
+        Combine lists of all jobs from all pages.
+        
+        Pages are sent to Gemini concurrently; results keep the input order.
+        
+        Args:
+            html_dict: Dictionary mapping source URL to HTML (None = fetch failed)
+            max_concurrency: Override for the number of parallel Gemini calls
+            
+        Returns:
+            List of job dictionaries from all pages
+        """
         all_jobs = []
+        pending = {}
         for url, html in html_dict.items():
-            if html:
-                jobs = self._parse_single_page(html, url)
-                all_jobs.extend(jobs)
+            if not html:
+                continue
+            clean_html = self._clean_html(html)
+            if not self._looks_like_job_page(clean_html):
+                logger.info(f"No job keywords on page, skipping Gemini: {url}")
+                continue
+            cached = self._get_cached_jobs(url, clean_html)
+            if cached is not None:
+                logger.info(f"Page unchanged since last parse, reusing {len(cached)} jobs: {url}")
+                all_jobs.extend(cached)
+            else:
+                pending[url] = clean_html
+        
+        batches = self._batch_pages(pending)
+        workers = min(len(batches), max_concurrency or self.max_concurrency)
+        
+        if workers <= 1:
+            results = [self._parse_batch(batch) for batch in batches]
+        else:
+            # Spread requests over all API keys so each key's rate limit is used
+            pool = self._get_pool()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(lambda batch: pool.next()._parse_batch(batch), batches))
+        
+        for jobs in results:
+            all_jobs.extend(jobs)
+        return all_jobs
+    
+    def _get_pool(self) -> "ParserPool":
+        """Build (once) a pool with one parser pinned to each configured key."""
+        with self._key_lock:
+            if self._pool is None:
+                keys = config.GEMINI_API_KEYS
+                if len(keys) <= 1:
+                    self._pool = ParserPool([self])
+                else:
+                    shards = []
+                    for key_idx in range(len(keys)):
+                        shard = Parser(max_concurrency=1)
+                        # Results land in this parser's cache, whichever key produced them
+                        shard._parse_cache = self._parse_cache
+                        shard._parse_cache_lock = self._parse_cache_lock
+                        shard._initialize_client(key_idx)
+                        shards.append(shard)
+                    self._pool = ParserPool(shards)
+            return self._pool
+    
+    def _batch_pages(self, pages: dict[str, str]) -> list[list[tuple[str, str]]]:
+        """
+        Group cleaned pages into requests.
+        
+        Small pages are packed together up to BATCH_CHAR_BUDGET / MAX_BATCH_PAGES
+        so the fixed per-request cost is paid once; large pages go alone.
+        """
+        batches, current, size = [], [], 0
+        for url, clean_html in pages.items():
+            if not clean_html:
+                continue
+            if len(clean_html) > self.BATCH_CHAR_BUDGET:
+                batches.append([(url, clean_html)])
+                continue
+            if current and (size + len(clean_html) > self.BATCH_CHAR_BUDGET or len(current) >= self.MAX_BATCH_PAGES):
+                batches.append(current)
+                current, size = [], 0
+            current.append((url, clean_html))
+            size += len(clean_html)
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _parse_batch(self, batch: list[tuple[str, str]]) -> list[dict]:
+        """Extract jobs for a group of cleaned pages with one Gemini request."""
+        if len(batch) == 1:
+            url, clean_html = batch[0]
+            return self._parse_clean_page(clean_html, url)
+        
+        prompt = [self.BATCH_EXTRACTION_PROMPT]
+        for url, clean_html in batch:
+            prompt += [f"---PAGE url={url}---", clean_html]
+        result = self._generate_with_retry(prompt)
+        
+        if not isinstance(result, dict):
+            # Unusable batched answer: fall back to one request per page
+            logger.warning(f"Batched extraction of {len(batch)} pages failed, parsing them one by one")
+            all_jobs = []
+            for url, clean_html in batch:
+                all_jobs.extend(self._parse_clean_page(clean_html, url))
+            return all_jobs
+        
+        all_jobs = []
+        for url, clean_html in batch:
+            all_jobs.extend(self._finalize_jobs(result.get(url), url, clean_html))
         return all_jobs
 
     def _parse_single_page(self, html: str, base_url: str) -> list[dict]:
         """Parse a single HTML page."""
-        clean_html = self._clean_html(html)
+        return self._parse_clean_page(self._clean_html(html), base_url)
+    
+    def _parse_clean_page(self, clean_html: str, base_url: str) -> list[dict]:
+        """Extract jobs from one already-cleaned page."""
         if not clean_html:
             return []
             
-        prompt = self.EXTRACTION_PROMPT + "\n\n" + clean_html
+        prompt = [self.EXTRACTION_PROMPT, clean_html]
+        
+        # Already parsed by _process_response inside the retry helper
+        return self._finalize_jobs(self._generate_with_retry(prompt, self.JOB_LIST_SCHEMA), base_url, clean_html)
+    
+    def _looks_like_job_page(self, clean_html: str) -> bool:
+        """Cheap keyword count (C-level bytes.count) before paying for an API call."""
+        data = clean_html.lower().encode("utf-8", "ignore")
+        hits = 0
+        for keyword in self.JOB_KEYWORDS:
+            hits += data.count(keyword)
+            if hits >= self.MIN_JOB_KEYWORD_HITS:
+                return True
+        return False
+    
+    @staticmethod
+    def _cache_key(url: str, clean_html: str) -> bytes:
+        return hashlib.sha1(f"{url}\0{clean_html}".encode("utf-8", "ignore")).digest()
+    
+    def _get_cached_jobs(self, url: str, clean_html: str) -> Optional[list[dict]]:
+        """Return copies of the jobs last parsed from this exact page, if any."""
+        key = self._cache_key(url, clean_html)
+        with self._parse_cache_lock:
+            jobs = self._parse_cache.get(key)
+            if jobs is None:
+                return None
+            self._parse_cache.move_to_end(key)
+            return [dict(job) for job in jobs]
+    
+    def _cache_jobs(self, url: str, clean_html: str, jobs: list[dict]):
+        """Remember parsed jobs for a page, evicting the least recently used entry."""
+        key = self._cache_key(url, clean_html)
+        with self._parse_cache_lock:
+            self._parse_cache[key] = [dict(job) for job in jobs]
+            self._parse_cache.move_to_end(key)
+            while len(self._parse_cache) > self.PARSE_CACHE_SIZE:
+                self._parse_cache.popitem(last=False)
+    
+    def _finalize_jobs(self, jobs, base_url: str, clean_html: Optional[str] = None) -> list[dict]:
+        """
+        Tag jobs with their source page and resolve relative links.
+        
+        Non-empty results are cached under clean_html when it is given; an
+        empty list may just mean the API call failed, so it isn't cached.
+        """
+        if not isinstance(jobs, list):
+            return []
         
         try:
-            response_list = self._generate_with_retry(prompt)
-            jobs = self._process_response(response_list)
-            
             # Post-processing: Resolve relative URLs
-            from urllib.parse import urljoin
             for job in jobs:
+                job["source_url"] = base_url
                 if job.get('url'):
                     # Resolve relative validation links
                     job['url'] = urljoin(base_url, job['url'])
-                    
+            
+            if jobs and clean_html is not None:
+                self._cache_jobs(base_url, clean_html, jobs)
             return jobs
         except Exception as e:
             logger.error(f"Partial extraction failed: {e}")
         return []
 
 
+class ParserPool:
+    """Round-robins work over a fixed set of parsers (one per API key)."""
+    
+    def __init__(self, parsers: list[Parser]):
+        self.parsers = parsers
+        self._cycle = itertools.cycle(parsers)
+        self._lock = threading.Lock()
+    
+    def next(self) -> Parser:
+        """Return the next parser whose key isn't cooling down (or just the next one if all are)."""
+        with self._lock:
+            for _ in range(len(self.parsers)):
+                candidate = next(self._cycle)
+                if not key_cooldowns.is_cooling(candidate._current_key_idx):
+                    return candidate
+            return next(self._cycle)
+
+
+class KeyCooldowns:
+    """
+    Tracks when each Gemini API key may be used again after a quota or auth error.
+    
+    Shared by every parser and kept in jobs.db (by key fingerprint, never the
+    key itself) so a restart doesn't go straight back to a quota'd key. Keys
+    cooled for auth errors are treated as unavailable, not as "ready soon".
+    """
+    
+    QUOTA_COOLDOWN = 60     # seconds after a 429
+    AUTH_COOLDOWN = 3600    # seconds after a 403 / invalid key
+    
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = db_path or config.DB_PATH
+        self._until: dict[str, float] = {}
+        self._auth: set[str] = set()  # fingerprints cooled for auth errors
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _fingerprint(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS gemini_key_cooldowns (
+                key_hash TEXT PRIMARY KEY,
+                cooldown_until REAL NOT NULL,
+                auth BOOLEAN DEFAULT FALSE
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(gemini_key_cooldowns)")}
+        if "auth" not in columns:
+            conn.execute("ALTER TABLE gemini_key_cooldowns ADD COLUMN auth BOOLEAN DEFAULT FALSE")
+        return conn
+    
+    def _load(self):
+        """Read still-active cooldowns from disk once (call with _lock held)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT key_hash, cooldown_until, auth FROM gemini_key_cooldowns WHERE cooldown_until > ?",
+                    (time.time(),)
+                ).fetchall()
+            finally:
+                conn.close()
+            for key_hash, until, auth in rows:
+                self._until[key_hash] = until
+                if auth:
+                    self._auth.add(key_hash)
+        except sqlite3.Error as e:
+            logger.debug(f"Could not load key cooldowns: {e}")
+    
+    def _ready_at(self, key_idx: int) -> float:
+        keys = config.GEMINI_API_KEYS
+        return self._until.get(self._fingerprint(keys[key_idx]), 0.0)
+    
+    def _auth_blocked(self, key_idx: int, now: float) -> bool:
+        """Whether a key is inside an auth-error cooldown (call with _lock held)."""
+        keys = config.GEMINI_API_KEYS
+        return self._fingerprint(keys[key_idx]) in self._auth and self._ready_at(key_idx) > now
+    
+    def cool(self, key_idx: int, seconds: Optional[float] = None, auth: bool = False):
+        """
+        Mark a key as unusable for a while.
+        
+        Args:
+            key_idx: Index into GEMINI_API_KEYS
+            seconds: Cooldown length (defaults to AUTH_COOLDOWN or QUOTA_COOLDOWN)
+            auth: The key failed authentication rather than hitting its quota
+        """
+        keys = config.GEMINI_API_KEYS
+        if not 0 <= key_idx < len(keys):
+            return
+        if seconds is None:
+            seconds = self.AUTH_COOLDOWN if auth else self.QUOTA_COOLDOWN
+        key_hash = self._fingerprint(keys[key_idx])
+        until = time.time() + seconds
+        with self._lock:
+            self._load()
+            self._until[key_hash] = until
+            if auth:
+                self._auth.add(key_hash)
+            else:
+                self._auth.discard(key_hash)
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO gemini_key_cooldowns (key_hash, cooldown_until, auth) VALUES (?, ?, ?)",
+                        (key_hash, until, auth)
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.debug(f"Could not save key cooldown: {e}")
+        logger.info(f"API key #{key_idx + 1} cooling down for {seconds:.0f}s")
+    
+    def is_cooling(self, key_idx: int) -> bool:
+        """Whether a key is still inside its cooldown window."""
+        if not 0 <= key_idx < len(config.GEMINI_API_KEYS):
+            return False
+        with self._lock:
+            self._load()
+            return self._ready_at(key_idx) > time.time()
+    
+    def pick(self) -> tuple[int, float]:
+        """
+        Choose the key to use next.
+        
+        Returns:
+            (key index, seconds to wait before using it). The wait is 0 unless
+            every key is cooling, in which case the earliest-ready key among
+            those cooling for quota is returned; if every key is cooling for
+            an auth error the wait is infinite.
+        """
+        keys = config.GEMINI_API_KEYS
+        if not keys:
+            return 0, 0.0
+        with self._lock:
+            self._load()
+            now = time.time()
+            usable = [i for i in range(len(keys)) if not self._auth_blocked(i, now)]
+            if not usable:
+                return min(range(len(keys)), key=self._ready_at), math.inf
+            key_idx = min(usable, key=self._ready_at)
+            return key_idx, max(0.0, self._ready_at(key_idx) - now)
+
+
+# Cooldowns shared by all parsers (a key's quota is per key, not per parser)
+key_cooldowns = KeyCooldowns()
+
 # Default parser instance
 parser = Parser()
@@ -4,12 +4,22 @@ Flask API for managing job sources and viewing tracked jobs.
 """
 
 
+import functools
 import threading
 import time
-from datetime import datetime
-from flask import Flask, jsonify, request, send_from_directory
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
+# Optional faster JSON encoder for API responses
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from logger import get_logger
 from storage import storage
 from unified_fetcher import unified_fetcher, JobSource
@@ -18,7 +28,30 @@ from notifier import notifier
 
 logger = get_logger(__name__)
 
-app = Flask(__name__, static_folder='static', static_url_path='/static')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (Flask's defaults handle unsupported types)."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # orjson already produces bytes; skip the str round trip jsonify does
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
+
+
+# Static files are served from the site root (/styles.css, /app.js) by Flask's
+# built-in static route, with ETag/Last-Modified revalidation
+app = Flask(__name__, static_folder='static', static_url_path='')
+# Asset names aren't versioned, so browsers may only reuse them briefly
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 300
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 CORS(app)
 
 # Scheduler state
@@ -28,11 +61,67 @@ scheduler_state = {
     "last_run": None,
     "next_run": None,
     "thread": None,
+    # Set to cut the scheduler's wait short (stop or interval change)
+    "wakeup": threading.Event(),
     "checks_today": 0,
     "changes_detected_today": 0,
     "last_reset": datetime.now().date()
 }
 
+# Today's date and the timestamp of the next midnight, so the daily reset
+# check is one time.time() comparison instead of building a datetime
+_today = {"date": None, "until": 0.0}
+
+
+def _current_date():
+    """Local date, recomputed only once the cached day has ended."""
+    if time.time() >= _today["until"]:
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        _today["date"] = now.date()
+        _today["until"] = midnight.timestamp()
+    return _today["date"]
+
+
+def _reset_daily_stats():
+    """Zero the per-day counters once the date has changed."""
+    today = _current_date()
+    if scheduler_state["last_reset"] != today:
+        scheduler_state["checks_today"] = 0
+        scheduler_state["changes_detected_today"] = 0
+        scheduler_state["last_reset"] = today
+
+# Read endpoints polled by the dashboard are served from a short-lived
+# cache; writes bump the version so changes show up immediately
+API_CACHE_TTL = 5  # seconds
+_api_cache_version = 0
+
+
+def _ttl_bucket() -> int:
+    """Current API_CACHE_TTL-sized time slot (part of each cache key)."""
+    return int(time.time() // API_CACHE_TTL)
+
+
+def invalidate_api_cache():
+    """Drop cached dashboard data after sources or jobs change."""
+    global _api_cache_version
+    _api_cache_version += 1
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_sources(bucket: int, version: int) -> list[dict]:
+    return storage.get_sources()
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_companies(bucket: int, version: int) -> list[str]:
+    return storage.get_companies()
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_counts(bucket: int, version: int) -> tuple[int, int]:
+    return storage.get_job_count(), storage.get_source_count()
+
 
 # ============================================================
 # API ROUTES
@@ -40,26 +129,14 @@ scheduler_state = {
 
 @app.route('/')
 def index():
-    """Serve the dashboard."""
-    return send_from_directory('static', 'index.html')
-
-
-@app.route('/styles.css')
-def serve_css():
-    """Serve CSS file."""
-    return send_from_directory('static', 'styles.css')
-
-
-@app.route('/app.js')
-def serve_js():
-    """Serve JavaScript file."""
-    return send_from_directory('static', 'app.js')
+    """Serve the dashboard (always revalidated, so new asset versions are picked up)."""
+    return send_from_directory(app.static_folder, 'index.html', max_age=0)
 
 
 @app.route('/api/sources', methods=['GET'])
 def get_sources():
     """Get all job sources."""
-    sources = storage.get_sources()
+    sources = _cached_sources(_ttl_bucket(), _api_cache_version)
     return jsonify(sources)
 
 
@@ -73,10 +150,12 @@ def add_source():
     source = {
         "name": data.get('name', ''),
         "url": data['url'],
-        "requires_browser": data.get('requires_browser', True)
+        "requires_browser": data.get('requires_browser', True),
+        "lazy_load": data.get('lazy_load', False)
     }
     
     source_id = storage.add_source(source)
+    invalidate_api_cache()
     return jsonify({"id": source_id, "message": "Source added"})
 
 
@@ -84,6 +163,7 @@ def add_source():
 def delete_source(source_id):
     """Delete a job source."""
     storage.delete_source(source_id)
+    invalidate_api_cache()
     return jsonify({"message": "Source deleted"})
 
 
@@ -91,27 +171,52 @@ def delete_source(source_id):
 def get_jobs():
     """Get all tracked jobs."""
     limit = request.args.get('limit', 100, type=int)
-    jobs = storage.get_all_jobs(limit=limit)
-    return jsonify(jobs)
+    # The dashboard list never shows descriptions; ?description=1 includes them
+    with_description = request.args.get('description', 0, type=int) == 1
+    
+    # Dashboard polls get a 304 until jobs are added or cleared
+    count, latest = storage.get_jobs_version()
+    etag = f"jobs-{limit}-{int(with_description)}-{count}-{latest}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    # Streamed a row at a time so large limits don't build the whole list
+    def generate():
+        yield '['
+        for i, job in enumerate(storage.iter_jobs(limit=limit, with_description=with_description)):
+            yield (',' if i else '') + app.json.dumps(job)
+        yield ']'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    response.set_etag(etag)
+    return response
 
 
 @app.route('/api/jobs/by-source', methods=['GET'])
 def get_jobs_by_source():
     """Get jobs grouped by source."""
     sources = storage.get_sources()
-    jobs = storage.get_all_jobs(limit=500)
+    by_url = storage.get_jobs_grouped_by_source_url(limit=500)
     
-    result = []
-    for source in sources:
-        source_jobs = [j for j in jobs if source['url'] in (j.get('source_url') or '')]
-        result.append({
-            "source": source,
-            "jobs": source_jobs
-        })
+    result = [{"source": source, "jobs": list(by_url.get(source['url'], []))} for source in sources]
+    
+    # Buckets that aren't exactly a source URL still belong to any source
+    # whose URL they contain; whatever is left is from an unknown source
+    known_urls = {s['url'] for s in sources}
+    unknown_jobs = []
+    for source_url, bucket in by_url.items():
+        if source_url in known_urls:
+            continue
+        matched = False
+        for entry in result:
+            if entry["source"]['url'] in source_url:
+                entry["jobs"].extend(bucket)
+                matched = True
+        if not matched:
+            unknown_jobs.extend(bucket)
     
-    # Also include jobs with unknown source
-    known_urls = [s['url'] for s in sources]
-    unknown_jobs = [j for j in jobs if not any(url in (j.get('source_url') or '') for url in known_urls)]
     if unknown_jobs:
         result.append({
             "source": {"id": 0, "name": "Other Sources", "url": ""},
@@ -124,23 +229,22 @@ def get_jobs_by_source():
 @app.route('/api/companies', methods=['GET'])
 def get_companies():
     """Get unique company names from all jobs."""
-    jobs = storage.get_all_jobs(limit=1000)
-    companies = sorted(set(j.get('company', 'Unknown') for j in jobs if j.get('company')))
-    return jsonify(companies)
+    response = jsonify(_cached_companies(_ttl_bucket(), _api_cache_version))
+    # Companies only change when the pipeline finds jobs; let the browser reuse it briefly
+    response.headers['Cache-Control'] = f'max-age={API_CACHE_TTL}'
+    return response
 
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get dashboard statistics."""
     # Reset daily stats if it's a new day
-    if scheduler_state["last_reset"] != datetime.now().date():
-        scheduler_state["checks_today"] = 0
-        scheduler_state["changes_detected_today"] = 0
-        scheduler_state["last_reset"] = datetime.now().date()
+    _reset_daily_stats()
 
-    return jsonify({
-        "total_jobs": storage.get_job_count(),
-        "total_sources": storage.get_source_count(),
+    total_jobs, total_sources = _cached_counts(_ttl_bucket(), _api_cache_version)
+    response = jsonify({
+        "total_jobs": total_jobs,
+        "total_sources": total_sources,
         "last_run": scheduler_state["last_run"],
         "next_run": scheduler_state["next_run"],
         "scheduler_running": scheduler_state["running"],
@@ -148,6 +252,9 @@ def get_stats():
         "checks_today": scheduler_state["checks_today"],
         "changes_detected": scheduler_state["changes_detected_today"]
     })
+    # Tiny payload, so hash it; unchanged polls get a bodiless 304
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route('/api/run', methods=['POST'])
@@ -165,6 +272,7 @@ def update_scheduler():
     enabled = data.get('enabled', True)
     
     scheduler_state["interval_minutes"] = interval
+    scheduler_state["wakeup"].set()
     
     if enabled and not scheduler_state["running"]:
         start_scheduler()
@@ -182,15 +290,27 @@ def update_scheduler():
 # PIPELINE LOGIC
 # ============================================================
 
+# Held for the duration of a run: a manual run and a scheduled one never overlap
+_pipeline_lock = threading.Lock()
+
+
 def run_pipeline_once():
-    """Run the job tracking pipeline once."""
+    """Run the job tracking pipeline once (skipped if a run is already in progress)."""
+    if not _pipeline_lock.acquire(blocking=False):
+        logger.warning("Pipeline already running, skipping this trigger")
+        return {"success": False, "message": "Pipeline is already running", "new_jobs": 0}
+    try:
+        return _run_pipeline()
+    finally:
+        _pipeline_lock.release()
+
+
+def _run_pipeline():
+    """Body of run_pipeline_once."""
     logger.info(f"Running pipeline at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Reset daily stats if it's a new day
-    if scheduler_state["last_reset"] != datetime.now().date():
-        scheduler_state["checks_today"] = 0
-        scheduler_state["changes_detected_today"] = 0
-        scheduler_state["last_reset"] = datetime.now().date()
+    _reset_daily_stats()
         
     scheduler_state["checks_today"] += 1
     
@@ -203,7 +323,8 @@ def run_pipeline_once():
         JobSource(
             url=s['url'],
             name=s['name'],
-            requires_browser=s.get('requires_browser', True)
+            requires_browser=s.get('requires_browser', True),
+            lazy_load=bool(s.get('lazy_load'))
         ) for s in sources
     ]
     
@@ -225,24 +346,33 @@ def run_pipeline_once():
     if new_candidates:
         logger.info(f"🔍 Deep Verification: Checking {len(new_candidates)} new candidates...")
         
+        candidates = []
+        listing_texts = {}
         for job in new_candidates:
-            url = job.get('url')
-            if not url:
+            if not job.get('url'):
                 continue
-                
-            try:
-                # Fetch detail page to confirm existence and content
-                # passing requires_browser=False for speed, assuming detail pages are largely static
-                detail_html = unified_fetcher.fetch(url, requires_browser=False)
-                
-                if parser.verify_job_page(detail_html, job):
-                    verified_jobs.append(job)
-                    logger.info(f"✅ Verified: {job['title']}")
-                else:
-                    logger.warning(f"❌ Rejected: {job['title']} (Detail Page Verification Failed)")
-                    
-            except Exception as e:
-                logger.error(f"⚠️ Verification error for {job.get('title')}: {e}")
+            source_url = job.get('source_url') or ''
+            if source_url not in listing_texts:
+                listing_texts[source_url] = parser.page_text(html_dict.get(source_url))
+            if parser.listing_is_authoritative(job, listing_texts[source_url]):
+                # Rich listing entry on the source's own site: no detail fetch needed
+                verified_jobs.append(job)
+                logger.info(f"✅ Verified from listing: {job['title']}")
+            else:
+                candidates.append(job)
+        
+        # Fetch detail pages to confirm existence and content, concurrently across hosts
+        # HTTP only for speed, assuming detail pages are largely static
+        detail_html = unified_fetcher.fetch_urls([job['url'] for job in candidates], default_browser=False)
+        detail_pages = [(detail_html.get(job['url']), job) for job in candidates]
+        
+        # Checked several pages per Gemini request
+        for (_, job), valid in zip(detail_pages, parser.verify_job_pages(detail_pages)):
+            if valid:
+                verified_jobs.append(job)
+                logger.info(f"✅ Verified: {job['title']}")
+            else:
+                logger.warning(f"❌ Rejected: {job['title']} (Detail Page Verification Failed)")
                 
     # Save verified jobs and notify
     if verified_jobs:
@@ -252,23 +382,29 @@ def run_pipeline_once():
     
     # Update source stats - FIXED: Now outside 'if new_jobs' block
     # Only update stats for sources that successfully fetched
+    # Parsed jobs carry the exact source URL they came from, so count them in one pass
+    jobs_per_source = Counter(j.get('source_url', '') for j in all_jobs)
+    source_stats = []
     for source in sources:
         source_url = source['url']
         
         # Check if this source was successfully fetched
         if html_dict.get(source_url) is not None:
             # Count jobs from this source in the parsed results
-            job_count_this_run = sum(1 for j in all_jobs if source_url in j.get('source_url', ''))
+            job_count_this_run = jobs_per_source[source_url]
             
             # Update stats only for successful fetches
             # This prevents overwriting with 0 when a source fails
-            storage.update_source_stats(source['id'], job_count_this_run)
+            source_stats.append((source['id'], job_count_this_run))
             logger.info(f"Updated {source['name']}: {job_count_this_run} jobs found in this run")
         else:
             # Source failed to fetch - leave stats unchanged
             logger.warning(f"Skipped stats update for {source['name']} (fetch failed)")
+    # Written in one transaction
+    storage.bulk_update_source_stats(source_stats)
     
     scheduler_state["last_run"] = datetime.now().isoformat()
+    invalidate_api_cache()
     # forced sync trigger
     
     return {
@@ -285,22 +421,36 @@ def run_pipeline_once():
 # SCHEDULER
 # ============================================================
 
+def _scheduler_active() -> bool:
+    """Whether the calling thread is the current, running scheduler."""
+    return scheduler_state["running"] and scheduler_state["thread"] is threading.current_thread()
+
+
 def scheduler_loop():
     """Background scheduler loop."""
-    while scheduler_state["running"]:
-        # Calculate next run
-        interval_seconds = scheduler_state["interval_minutes"] * 60
-        next_run = datetime.now().timestamp() + interval_seconds
-        scheduler_state["next_run"] = datetime.fromtimestamp(next_run).isoformat()
-        
-        # Wait for interval
-        time.sleep(interval_seconds)
+    wakeup = scheduler_state["wakeup"]
+    cycle_start = next_run = time.time()
+    while _scheduler_active():
+        # Wait for interval; a wakeup re-reads the interval (or notices a stop)
+        while _scheduler_active():
+            next_run = cycle_start + scheduler_state["interval_minutes"] * 60
+            scheduler_state["next_run"] = datetime.fromtimestamp(next_run).isoformat()
+            remaining = next_run - time.time()
+            if remaining <= 0:
+                break
+            if wakeup.wait(timeout=remaining):
+                wakeup.clear()
         
-        if scheduler_state["running"]:
+        if _scheduler_active():
             try:
                 run_pipeline_once()
             except Exception as e:
                 logger.error(f"Scheduler error: {e}", exc_info=True)
+        
+        # Fixed rate: count the next interval from when this run was due, not
+        # from when it finished. A run longer than the interval is followed by
+        # one immediate catch-up run rather than one per missed slot.
+        cycle_start = max(next_run, time.time() - scheduler_state["interval_minutes"] * 60)
 
 
 def start_scheduler():
@@ -316,6 +466,7 @@ def stop_scheduler():
     """Stop the background scheduler."""
     scheduler_state["running"] = False
     scheduler_state["next_run"] = None
+    scheduler_state["wakeup"].set()
     logger.info("Scheduler stopped")
 
 
@@ -332,4 +483,6 @@ if __name__ == '__main__':
     # Start scheduler by default
     start_scheduler()
     
-    app.run(host='0.0.0.0', debug=True, port=5000, use_reloader=False)
+    # Threaded so the dashboard keeps answering during a manual /api/run;
+    # see wsgi.py for running under gunicorn instead
+    app.run(host='0.0.0.0', debug=True, port=5000, use_reloader=False, threaded=True)
@@ -3,28 +3,79 @@ SQLite Storage module for Job Pipeline Tracker.
 Handles persistence of seen jobs and new job detection.
 """
 
+import functools
 import sqlite3
 import hashlib
-import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import groupby
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 from config import config
 from logger import get_logger
 
 logger = get_logger(__name__)
 
+# Every byte except a-z0-9; bytes.translate drops them in one C pass
+_NON_ALNUM_BYTES = bytes(b for b in range(256) if not (48 <= b <= 57 or 97 <= b <= 122))
+
+
+@functools.lru_cache(maxsize=10_000)
+def _job_id(raw_title: str, raw_url: str) -> str:
+    """Hash a normalized (title, url) pair; memoized since the same jobs recur every run."""
+    # 1. Normalize Title: lowercase, keep only alphanumeric (removes spaces, -, etc)
+    # "Software Engineer " -> "softwareengineer"
+    # "Software Engineer - Backend" -> "softwareengineerbackend"
+    # (non-ASCII characters go too, exactly as with re.sub(r'[^a-z0-9]', ...))
+    normalized_title = raw_title.lower().encode('ascii', 'ignore').translate(None, _NON_ALNUM_BYTES)
+    
+    # 2. Normalize URL: remove query params, fragments, trailing slashes
+    # "example.com/job?ref=123" -> "example.com/job"
+    normalized_url = raw_url.split('?')[0].split('#')[0].rstrip('/').lower()
+    
+    # Hash b"<title>|<url>" fed in pieces, without building the joined string.
+    # Same 32 hex chars as the old MD5 ids, from a faster hash
+    digest = hashlib.blake2b(normalized_title, digest_size=16)
+    digest.update(b'|')
+    digest.update(normalized_url.encode())
+    return digest.hexdigest()
+
 
 class Storage:
     """SQLite-based storage for tracking seen jobs."""
     
+    # Applied once when the shared connection opens. WAL lets the dashboard
+    # read while the pipeline writes; NORMAL sync is safe under WAL.
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-20000",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA temp_store=MEMORY",
+    )
+    
+    # Bumped when stored data needs migrating (tracked in PRAGMA user_version)
+    SCHEMA_VERSION = 2
+    
+    # Everything but description, which is by far the widest column and
+    # isn't shown in job lists
+    LIST_COLUMNS = "job_id, title, company, location, url, source_url, first_seen, notified"
+    
     def __init__(self, db_path: Optional[Path] = None):
         self.db_path = db_path or config.DB_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        # Job ids already stored, loaded on first find_new_jobs
+        self._known_ids: Optional[set[str]] = None
         self._init_db()
     
     def _init_db(self):
         """Initialize database schema."""
         with self._get_connection() as conn:
+            # sqlite3 runs DDL in autocommit mode; one explicit transaction
+            # makes the whole setup (and any migration) a single commit
+            conn.execute("BEGIN")
             # Jobs table
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS jobs (
@@ -43,6 +94,19 @@ class Storage:
                 CREATE INDEX IF NOT EXISTS idx_jobs_notified 
                 ON jobs(notified)
             ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_jobs_source_url 
+                ON jobs(source_url)
+            ''')
+            # Newest-first listings and the company filter read these in index order
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_jobs_first_seen 
+                ON jobs(first_seen DESC)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_jobs_company 
+                ON jobs(company)
+            ''')
             
             # Sources table for dashboard management
             conn.execute('''
@@ -53,46 +117,110 @@ class Storage:
                     requires_browser BOOLEAN DEFAULT TRUE,
                     last_checked DATETIME,
                     job_count INTEGER DEFAULT 0,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    lazy_load BOOLEAN DEFAULT FALSE
+                )
+            ''')
+            
+            # Row counts kept up to date by triggers, so the dashboard
+            # doesn't COUNT(*) the tables on every poll
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
                 )
             ''')
+            self._create_count_triggers(conn)
+            
+            # Columns added after the first release
+            source_columns = {row["name"] for row in conn.execute("PRAGMA table_info(sources)")}
+            if "lazy_load" not in source_columns:
+                conn.execute("ALTER TABLE sources ADD COLUMN lazy_load BOOLEAN DEFAULT FALSE")
+            
+            self._migrate(conn)
             conn.commit()
     
-    def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection."""
-        conn = sqlite3.connect(self.db_path)
+    @staticmethod
+    def _create_count_triggers(conn: sqlite3.Connection):
+        """Keep meta.job_count / meta.source_count in step with the tables."""
+        for table, key in (("jobs", "job_count"), ("sources", "source_count")):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table}
+                BEGIN UPDATE meta SET value = value + 1 WHERE key = '{key}'; END
+            ''')
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table}
+                BEGIN UPDATE meta SET value = value - 1 WHERE key = '{key}'; END
+            ''')
+    
+    def _migrate(self, conn: sqlite3.Connection):
+        """Bring stored data up to SCHEMA_VERSION."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+        
+        if version < 1:
+            # Job ids were MD5 hashes; recompute them so dedup still matches
+            rows = conn.execute("SELECT job_id, title, url FROM jobs").fetchall()
+            conn.executemany(
+                "UPDATE OR IGNORE jobs SET job_id = ? WHERE job_id = ?",
+                [(self.generate_job_id({"title": row["title"], "url": row["url"] or ""}), row["job_id"])
+                 for row in rows]
+            )
+            logger.info(f"Rehashed {len(rows)} job ids")
+        
+        if version < 2:
+            # Seed the trigger-maintained counters from the existing rows
+            conn.execute("""
+                INSERT OR REPLACE INTO meta (key, value) VALUES
+                ('job_count', (SELECT COUNT(*) FROM jobs)),
+                ('source_count', (SELECT COUNT(*) FROM sources))
+            """)
+        
+        conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open and tune a database connection."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
         return conn
     
+    @contextmanager
+    def _get_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow the shared database connection.
+        
+        The connection is opened once per Storage and reused; the lock
+        serializes the Flask and scheduler threads. Commits on success and
+        rolls back if the block raises.
+        """
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            with self._conn:
+                yield self._conn
+    
+    def close(self):
+        """Close the shared connection (reopened on next use)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
     @staticmethod
     def generate_job_id(job: dict) -> str:
         """
         Generate unique ID for a job based on normalized title and URL.
         Aggressively normalizes to handle slight variations (spaces, params, casing).
         """
-        # 1. Normalize Title: lowercase, keep only alphanumeric (removes spaces, -, etc)
-        # "Software Engineer " -> "softwareengineer"
-        # "Software Engineer - Backend" -> "softwareengineerbackend"
-        raw_title = job.get('title', '')
-        normalized_title = re.sub(r'[^a-z0-9]', '', raw_title.lower())
-        
-        # 2. Normalize URL: remove query params, fragments, trailing slashes
-        # "example.com/job?ref=123" -> "example.com/job"
-        raw_url = job.get('url', '')
-        normalized_url = raw_url.split('?')[0].split('#')[0].rstrip('/').lower()
-        
-        unique_str = f"{normalized_title}|{normalized_url}"
-        return hashlib.md5(unique_str.encode()).hexdigest()
+        return _job_id(job.get('title') or '', job.get('url') or '')
     
     def is_new_job(self, job: dict) -> bool:
         """Check if a job is new (not in database)."""
-        job_id = self.generate_job_id(job)
-        with self._get_connection() as conn:
-            result = conn.execute(
-                "SELECT 1 FROM jobs WHERE job_id = ?", 
-                (job_id,)
-            ).fetchone()
-            return result is None
+        # Same in-memory id set as find_new_jobs; the copy keeps job untouched
+        return bool(self.find_new_jobs([dict(job)]))
     
     def find_new_jobs(self, jobs: list[dict]) -> list[dict]:
         """
@@ -104,65 +232,184 @@ class Storage:
         Returns:
             List of jobs not yet in database
         """
-        new_jobs = []
-        for job in jobs:
-            if self.is_new_job(job):
-                job["job_id"] = self.generate_job_id(job)
-                new_jobs.append(job)
+        job_ids = [self.generate_job_id(job) for job in jobs]
+        
+        with self._get_connection() as conn:
+            seen = self._get_known_ids(conn)
+            
+            new_jobs = []
+            for job, job_id in zip(jobs, job_ids):
+                if job_id not in seen:
+                    job["job_id"] = job_id
+                    new_jobs.append(job)
         return new_jobs
     
+    def _get_known_ids(self, conn: sqlite3.Connection) -> set[str]:
+        """
+        All stored job ids, held in memory for dedup (call with the connection borrowed).
+        
+        Job ids are the primary key, so the set is in sync exactly when its
+        size matches the trigger-maintained job_count; a mismatch means another
+        process (e.g. reset_jobs.py) changed the table, and the set is reloaded.
+        """
+        count = conn.execute("SELECT value FROM meta WHERE key = 'job_count'").fetchone()[0]
+        if self._known_ids is None or len(self._known_ids) != count:
+            self._known_ids = {row[0] for row in conn.execute("SELECT job_id FROM jobs")}
+        return self._known_ids
+    
+    INSERT_JOB_SQL = '''
+        INSERT OR IGNORE INTO jobs 
+        (job_id, title, company, location, url, description, source_url, notified)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    def _job_row(self, job: dict) -> tuple:
+        """Column values for INSERT_JOB_SQL."""
+        return (
+            job.get("job_id") or self.generate_job_id(job),
+            job.get("title", "Unknown"),
+            job.get("company", "Unknown"),
+            job.get("location", "Not specified"),
+            job.get("url", ""),
+            job.get("description", ""),
+            job.get("source_url", ""),
+            False
+        )
+    
     def save_job(self, job: dict):
         """Save a job to the database."""
-        job_id = job.get("job_id") or self.generate_job_id(job)
-        
-        with self._get_connection() as conn:
-            conn.execute('''
-                INSERT OR IGNORE INTO jobs 
-                (job_id, title, company, location, url, description, source_url, notified)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                job_id,
-                job.get("title", "Unknown"),
-                job.get("company", "Unknown"),
-                job.get("location", "Not specified"),
-                job.get("url", ""),
-                job.get("description", ""),
-                job.get("source_url", ""),
-                False
-            ))
-            conn.commit()
+        self.save_jobs([job])
     
     def save_jobs(self, jobs: list[dict]):
-        """Save multiple jobs to database."""
-        for job in jobs:
-            self.save_job(job)
+        """Save multiple jobs to database in one transaction."""
+        rows = [self._job_row(job) for job in jobs]
+        with self._get_connection() as conn:
+            conn.executemany(self.INSERT_JOB_SQL, rows)
+            conn.commit()
+            if self._known_ids is not None:
+                self._known_ids.update(row[0] for row in rows)
     
     def mark_notified(self, jobs: list[dict]):
         """Mark jobs as having been notified."""
+        job_ids = [(job.get("job_id") or self.generate_job_id(job),) for job in jobs]
         with self._get_connection() as conn:
-            for job in jobs:
-                job_id = job.get("job_id") or self.generate_job_id(job)
-                conn.execute(
-                    "UPDATE jobs SET notified = TRUE WHERE job_id = ?",
-                    (job_id,)
-                )
+            # Already-notified rows are skipped so their pages are not rewritten
+            conn.executemany("UPDATE jobs SET notified = TRUE WHERE job_id = ? AND notified = FALSE", job_ids)
             conn.commit()
     
-    def get_all_jobs(self, limit: int = 100) -> list[dict]:
-        """Get all stored jobs."""
+    def _list_columns(self, with_description: bool) -> str:
+        """Column list for job list queries."""
+        return "*" if with_description else self.LIST_COLUMNS
+    
+    @staticmethod
+    def _fetch_dicts(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> list[dict]:
+        """Run a query and return plain dicts, skipping the per-row sqlite3.Row wrapper."""
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(sql, params)
+        columns = [d[0] for d in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    
+    def get_all_jobs(self, limit: int = 100, with_description: bool = False) -> list[dict]:
+        """Get all stored jobs (descriptions only if with_description)."""
         with self._get_connection() as conn:
-            rows = conn.execute(
-                "SELECT * FROM jobs ORDER BY first_seen DESC LIMIT ?",
+            return self._fetch_dicts(
+                conn,
+                f"SELECT {self._list_columns(with_description)} FROM jobs ORDER BY first_seen DESC LIMIT ?",
                 (limit,)
+            )
+    
+    def iter_jobs(self, limit: int = 100, batch_size: int = 200,
+                  with_description: bool = False) -> Iterator[dict]:
+        """
+        Yield stored jobs newest first, like get_all_jobs, a batch at a time.
+        
+        Each batch is a separate keyset-paged query, so the shared connection
+        is only held while a batch is read, not while the caller consumes it.
+        """
+        columns = self._list_columns(with_description)
+        cursor = None
+        remaining = limit
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            with self._get_connection() as conn:
+                if cursor is None:
+                    rows = self._fetch_dicts(
+                        conn,
+                        f"SELECT {columns} FROM jobs ORDER BY first_seen DESC, job_id DESC LIMIT ?",
+                        (size,)
+                    )
+                else:
+                    rows = self._fetch_dicts(
+                        conn,
+                        f"SELECT {columns} FROM jobs WHERE (first_seen, job_id) < (?, ?) "
+                        "ORDER BY first_seen DESC, job_id DESC LIMIT ?",
+                        (*cursor, size)
+                    )
+            yield from rows
+            if len(rows) < size:
+                return
+            remaining -= len(rows)
+            cursor = (rows[-1]["first_seen"], rows[-1]["job_id"])
+    
+    def get_jobs_grouped_by_source_url(self, limit: int = 500,
+                                       with_description: bool = False) -> dict[str, list[dict]]:
+        """
+        Get the most recent jobs grouped by their source URL.
+        
+        Args:
+            limit: Number of most recent jobs to include
+            with_description: Also load each job's description
+            
+        Returns:
+            Dictionary mapping source_url ('' if unknown) to its jobs, newest first
+        """
+        with self._get_connection() as conn:
+            rows = self._fetch_dicts(conn, f"""
+                SELECT * FROM (
+                    SELECT {self._list_columns(with_description)} FROM jobs
+                    ORDER BY first_seen DESC LIMIT ?
+                )
+                ORDER BY COALESCE(source_url, ''), first_seen DESC
+            """, (limit,))
+        
+        # NULL and '' sort together, so each key forms exactly one run
+        return {
+            source_url: list(group)
+            for source_url, group in groupby(rows, key=lambda row: row['source_url'] or '')
+        }
+    
+    def get_job_counts_by_source_url(self) -> dict[str, int]:
+        """Count stored jobs per distinct source URL (served from idx_jobs_source_url)."""
+        with self._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT source_url, COUNT(*) FROM jobs WHERE source_url IS NOT NULL GROUP BY source_url"
             ).fetchall()
-            return [dict(row) for row in rows]
+            return {row[0]: row[1] for row in rows}
+    
+    def get_companies(self) -> list[str]:
+        """Get the distinct company names of all stored jobs, sorted."""
+        with self._get_connection() as conn:
+            rows = conn.execute("""
+                SELECT DISTINCT company FROM jobs
+                WHERE company IS NOT NULL AND company != ''
+                ORDER BY company
+            """).fetchall()
+            return [row[0] for row in rows]
     
     def get_job_count(self) -> int:
         """Get total number of jobs in database."""
         with self._get_connection() as conn:
-            result = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()
+            result = conn.execute("SELECT value FROM meta WHERE key = 'job_count'").fetchone()
             return result[0]
     
+    def get_jobs_version(self) -> tuple[int, Optional[str]]:
+        """(job count, newest first_seen): changes whenever jobs are added or cleared."""
+        with self._get_connection() as conn:
+            count = conn.execute("SELECT value FROM meta WHERE key = 'job_count'").fetchone()[0]
+            latest = conn.execute("SELECT MAX(first_seen) FROM jobs").fetchone()[0]
+            return count, latest
+    
     def clear_all(self, confirmation: str = ""):
         """
         Clear all jobs from database. DANGEROUS operation!
@@ -180,8 +427,20 @@ class Storage:
             )
         
         with self._get_connection() as conn:
+            # Unqualified DELETE in one transaction lets SQLite truncate the
+            # table instead of logging every row; a DELETE trigger would turn
+            # that off, so the counter is reset by hand around it. The legacy
+            # sqlite3 mode wouldn't open a transaction before the DROP, so
+            # begin explicitly: the trigger is never left dropped on failure
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DROP TRIGGER IF EXISTS trg_jobs_count_delete")
             conn.execute("DELETE FROM jobs")
+            conn.execute("UPDATE meta SET value = 0 WHERE key = 'job_count'")
+            self._create_count_triggers(conn)
             conn.commit()
+            self._known_ids = None
+            # VACUUM can't run inside a transaction; it hands the freed pages back to the OS
+            conn.execute("VACUUM")
             logger.warning("⚠️  ALL JOBS DELETED - Database cleared")
     
     # ============================================================
@@ -199,19 +458,20 @@ class Storage:
     def get_source_count(self) -> int:
         """Get total number of sources."""
         with self._get_connection() as conn:
-            result = conn.execute("SELECT COUNT(*) FROM sources").fetchone()
+            result = conn.execute("SELECT value FROM meta WHERE key = 'source_count'").fetchone()
             return result[0]
     
     def add_source(self, source: dict) -> int:
         """Add a new job source. Returns source ID."""
         with self._get_connection() as conn:
             cursor = conn.execute('''
-                INSERT OR IGNORE INTO sources (name, url, requires_browser)
-                VALUES (?, ?, ?)
+                INSERT OR IGNORE INTO sources (name, url, requires_browser, lazy_load)
+                VALUES (?, ?, ?, ?)
             ''', (
                 source.get('name', 'Unnamed'),
                 source['url'],
-                source.get('requires_browser', True)
+                source.get('requires_browser', True),
+                source.get('lazy_load', False)
             ))
             conn.commit()
             return cursor.lastrowid
@@ -224,12 +484,16 @@ class Storage:
     
     def update_source_stats(self, source_id: int, job_count: int):
         """Update source statistics after a run."""
+        self.bulk_update_source_stats([(source_id, job_count)])
+    
+    def bulk_update_source_stats(self, stats: list[tuple[int, int]]):
+        """Update statistics for several sources in one transaction."""
         with self._get_connection() as conn:
-            conn.execute('''
+            conn.executemany('''
                 UPDATE sources 
                 SET last_checked = CURRENT_TIMESTAMP, job_count = ?
                 WHERE id = ?
-            ''', (job_count, source_id))
+            ''', [(job_count, source_id) for source_id, job_count in stats])
             conn.commit()
 
 
@@ -1,8 +1,21 @@
+"""
+Manual smoke test for BrowserFetcher (and the plain HTTP fallback).
+
+One BrowserFetcher is shared across every target, so Chromium starts once
+per run instead of once per URL.
+
+Usage:
+    python test_browser.py                      # default targets
+    python test_browser.py https://example.com  # custom targets
+    python test_browser.py --no-http --dump-log
+"""
+
+import argparse
 import logging
-import sys
-import time
 import os
+import sys
 import requests
+from requests.adapters import HTTPAdapter
 from browser_fetcher import BrowserFetcher
 
 # Configure logging to stdout
@@ -12,86 +25,117 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)]
 )
 
-def test_browser():
+TERMUX_CERT = "/data/data/com.termux/files/usr/etc/tls/cert.pem"
+DEFAULT_LOG_PATH = "/data/data/com.termux/files/home/job_pipeline/chromedriver.log"
+
+TARGETS = [
+    ("LIGHT", "https://example.com"),
+    ("MEDIUM", "https://www.google.com"),
+    ("HEAVY", "https://www.metacareers.com/jobsearch?teams[0]=University%20Grad%20-%20Business&teams[1]=University%20Grad%20-%20Engineering%2C%20Tech%20%26%20Design&teams[2]=University%20Grad%20-%20PhD%20%26%20Postdoc&sort_by_new=true&offices[0]=North%20America")
+]
+
+# Better headers to avoid 400 Bad Request
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    "Sec-Ch-Ua-Mobile": "?0",
+    "Sec-Ch-Ua-Platform": '"Windows"',
+    "Upgrade-Insecure-Requests": "1"
+}
+
+# Keep-alive session for the HTTP fallback, so repeat hosts skip the handshake
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+SESSION.headers.update(HTTP_HEADERS)
+
+
+def check_browser(fetcher: BrowserFetcher, url: str):
+    """Fetch url through the shared browser."""
+    print("[BROWSER] Attempting fetch...")
+    try:
+        html = fetcher.fetch(url)
+        if html:
+            print(f"[BROWSER] SUCCESS: Fetched {len(html)} bytes.")
+        else:
+            print("[BROWSER] FAILURE: Returned None.")
+    except Exception as e:
+        print(f"[BROWSER] CRASHED: {e}")
+
+
+def check_http(url: str):
+    """Fetch url with plain requests (simulating the UnifiedFetcher fallback)."""
+    print("[HTTP]    Attempting fetch (Fallback)...")
+    try:
+        # Streamed and only counted: the body is never decoded to str
+        with SESSION.get(url, timeout=15, stream=True) as response:
+            if response.status_code == 200:
+                size = sum(len(chunk) for chunk in response.iter_content(65536))
+                print(f"[HTTP]    SUCCESS: Fetched {size} bytes.")
+            else:
+                print(f"[HTTP]    FAILURE: Status Code {response.status_code}")
+                print(f"[HTTP]    Response headers: {response.headers}")
+    except Exception as e:
+        print(f"[HTTP]    FAILED: {e}")
+
+
+def dump_log(log_path: str, lines: int = 20):
+    """Print the tail of the chromedriver log."""
+    if not os.path.exists(log_path):
+        print(f"\nLog file not found at: {log_path}")
+        return
+    print("\n" + "="*20 + f" CHROMEDRIVER LOG (LAST {lines} LINES) " + "="*20)
+    try:
+        with open(log_path, 'r', errors='ignore') as f:
+            for line in f.readlines()[-lines:]:
+                print(line.strip())
+    except Exception as log_err:
+        print(f"Could not read log file: {log_err}")
+    print("="*60)
+
+
+def run(targets: list[tuple[str, str]], log_path: str, http: bool = True, show_log: bool = False):
+    """Run every target through one BrowserFetcher (and optionally plain HTTP)."""
     print("="*50)
     print("TESTING BROWSER FETCHER ON TERMUX")
     print("="*50)
-    
+
+    # Temporary SSL Verification fix for Termux
+    if os.path.exists(TERMUX_CERT):
+        os.environ["SSL_CERT_FILE"] = TERMUX_CERT
+
     try:
         # Enable verbose logging for debugging
-        service_args = ["--verbose", "--log-path=/data/data/com.termux/files/home/job_pipeline/chromedriver.log"]
-        fetcher = BrowserFetcher(service_args=service_args)
-        
-        print(f"DEBUG: Logging enabled at /data/data/com.termux/files/home/job_pipeline/chromedriver.log")
-        
+        fetcher = BrowserFetcher(service_args=["--verbose", f"--log-path={log_path}"])
+        print(f"DEBUG: Logging enabled at {log_path}")
     except Exception as e:
         print(f"FAILED to initialize BrowserFetcher: {e}")
         return
 
-    # Define test targets
-    targets = [
-        ("LIGHT", "https://example.com"),
-        ("MEDIUM", "https://www.google.com"),
-        ("HEAVY", "https://www.metacareers.com/jobsearch?teams[0]=University%20Grad%20-%20Business&teams[1]=University%20Grad%20-%20Engineering%2C%20Tech%20%26%20Design&teams[2]=University%20Grad%20-%20PhD%20%26%20Postdoc&sort_by_new=true&offices[0]=North%20America")
-    ]
-    
-    for name, url in targets:
-        print(f"\n--- TESTING {name} ({url}) ---")
-        
-        # 1. Test Browser
-        print("[BROWSER] Attempting fetch...")
-        try:
-            html = fetcher.fetch(url)
-            if html:
-                print(f"[BROWSER] SUCCESS: Fetched {len(html)} bytes.")
-            else:
-                print("[BROWSER] FAILURE: Returned None.")
-        except Exception as e:
-            print(f"[BROWSER] CRASHED: {e}")
-
-        # 2. Test HTTP Fallback (simulating UnifiedFetcher)
-        print("[HTTP]    Attempting fetch (Fallback)...")
-        try:
-            # Better headers to avoid 400 Bad Request
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                "Sec-Ch-Ua-Mobile": "?0",
-                "Sec-Ch-Ua-Platform": '"Windows"',
-                "Upgrade-Insecure-Requests": "1"
-            }
-            
-            # Temporary SSL Verification fix for Termux
-            verify_ssl = True
-            if os.path.exists("/data/data/com.termux/files/usr/etc/tls/cert.pem"):
-                os.environ["SSL_CERT_FILE"] = "/data/data/com.termux/files/usr/etc/tls/cert.pem"
-            
-            response = requests.get(url, headers=headers, timeout=15)
-            
-            if response.status_code == 200:
-                 print(f"[HTTP]    SUCCESS: Fetched {len(response.text)} bytes.")
-            else:
-                 print(f"[HTTP]    FAILURE: Status Code {response.status_code}")
-                 print(f"[HTTP]    Response headers: {response.headers}")
-        except Exception as e:
-            print(f"[HTTP]    FAILED: {e}")
-
-    # Print logs at the end if they exist
-    log_path = "/data/data/com.termux/files/home/job_pipeline/chromedriver.log"
-    if os.path.exists(log_path):
-        print("\n" + "="*20 + " CHROMEDRIVER LOG (LAST 20 LINES) " + "="*20)
-        try:
-            with open(log_path, 'r', errors='ignore') as f:
-                lines = f.readlines()
-                for line in lines[-20:]:
-                    print(line.strip())
-        except Exception as log_err:
-            print(f"Could not read log file: {log_err}")
-        print("="*60)
-    else:
-        print(f"\nLog file not found at: {log_path}")
+    with fetcher:
+        for name, url in targets:
+            print(f"\n--- TESTING {name} ({url}) ---")
+            check_browser(fetcher, url)
+            if http:
+                check_http(url)
+
+    if show_log:
+        dump_log(log_path)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Smoke-test BrowserFetcher against a few pages")
+    arg_parser.add_argument("urls", nargs="*", help="URLs to fetch (defaults to the built-in targets)")
+    arg_parser.add_argument("--log-path", default=DEFAULT_LOG_PATH, help="chromedriver log file")
+    arg_parser.add_argument("--no-http", action="store_true", help="skip the plain HTTP fallback check")
+    arg_parser.add_argument("--dump-log", action="store_true", help="print the chromedriver log tail at the end")
+    args = arg_parser.parse_args()
+
+    targets = [(f"URL{i}", url) for i, url in enumerate(args.urls, 1)] or TARGETS
+    run(targets, args.log_path, http=not args.no_http, show_log=args.dump_log)
+
 
 if __name__ == "__main__":
-    test_browser()
+    main()
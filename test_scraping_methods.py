@@ -1,8 +1,17 @@
 import requests
+from requests.adapters import HTTPAdapter
 import urllib.request
 import subprocess
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Optional libcurl binding: same TLS stack as the curl CLI without a fork+exec per probe
+try:
+    import pycurl
+    PYCURL_AVAILABLE = True
+except ImportError:
+    PYCURL_AVAILABLE = False
 
 # Targets
 TARGETS = [
@@ -10,6 +19,17 @@ TARGETS = [
     ("Meta", "https://www.metacareers.com/jobsearch?teams[0]=University%20Grad%20-%20Business&teams[1]=University%20Grad%20-%20Engineering%2C%20Tech%20%26%20Design&teams[2]=University%20Grad%20-%20PhD%20%26%20Postdoc&sort_by_new=true&offices[0]=North%20America")
 ]
 
+# One keep-alive session for every requests-based method, so repeat hits to
+# the same host skip the TCP+TLS handshake; calls only override what differs
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+})
+
 # SSL Fix for Termux
 if os.path.exists("/data/data/com.termux/files/usr/etc/tls/cert.pem"):
     os.environ["SSL_CERT_FILE"] = "/data/data/com.termux/files/usr/etc/tls/cert.pem"
@@ -17,19 +37,17 @@ if os.path.exists("/data/data/com.termux/files/usr/etc/tls/cert.pem"):
 def log(msg):
     print(f"[TEST] {msg}")
 
+def body_size(resp):
+    """Byte length of a streamed response, read in chunks and never decoded."""
+    return sum(len(chunk) for chunk in resp.iter_content(65536))
+
 def test_requests_desktop(url):
     log("Method: Requests (Desktop UA)")
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Connection": "keep-alive"
-    }
     try:
-        resp = requests.get(url, headers=headers, timeout=15)
-        if resp.status_code == 200:
-            return True, f"Success ({len(resp.text)} bytes)"
-        return False, f"Status {resp.status_code}"
+        with SESSION.get(url, timeout=15, stream=True) as resp:
+            if resp.status_code == 200:
+                return True, f"Success ({body_size(resp)} bytes)"
+            return False, f"Status {resp.status_code}"
     except Exception as e:
         return False, str(e)
 
@@ -40,10 +58,10 @@ def test_requests_mobile(url):
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
     }
     try:
-        resp = requests.get(url, headers=headers, timeout=15)
-        if resp.status_code == 200:
-            return True, f"Success ({len(resp.text)} bytes)"
-        return False, f"Status {resp.status_code}"
+        with SESSION.get(url, headers=headers, timeout=15, stream=True) as resp:
+            if resp.status_code == 200:
+                return True, f"Success ({body_size(resp)} bytes)"
+            return False, f"Status {resp.status_code}"
     except Exception as e:
         return False, str(e)
 
@@ -63,14 +81,14 @@ def test_urllib(url):
     except Exception as e:
         return False, str(e)
 
+CURL_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+
 def test_curl(url):
+    if PYCURL_AVAILABLE:
+        return test_pycurl(url)
     log("Method: Curl (Subprocess)")
     # Basic curl mimicking a browser
-    cmd = [
-        "curl", "-L", "-s",
-        "-A", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        url
-    ]
+    cmd = ["curl", "-L", "-s", "-A", CURL_UA, url]
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=20)
         if result.returncode == 0 and len(result.stdout) > 500:
@@ -79,6 +97,34 @@ def test_curl(url):
     except Exception as e:
         return False, str(e)
 
+def test_pycurl(url):
+    log("Method: Curl (libcurl via pycurl)")
+    size = 0
+
+    def count(chunk):
+        nonlocal size
+        size += len(chunk)
+
+    curl = pycurl.Curl()
+    try:
+        curl.setopt(pycurl.URL, url)
+        curl.setopt(pycurl.USERAGENT, CURL_UA)
+        curl.setopt(pycurl.FOLLOWLOCATION, 1)
+        curl.setopt(pycurl.TIMEOUT, 20)
+        curl.setopt(pycurl.WRITEFUNCTION, count)
+        curl.perform()
+        status = curl.getinfo(pycurl.RESPONSE_CODE)
+        if status == 200 and size > 500:
+            return True, f"Success ({size} bytes)"
+        return False, f"Status {status} (Len: {size})"
+    except pycurl.error as e:
+        return False, str(e)
+    finally:
+        curl.close()
+
+
+METHODS = [test_requests_desktop, test_requests_mobile, test_urllib, test_curl]
+
 
 def test_meta_specialized():
     log("Method: Requests (Meta Specialized - Params Dict)")
@@ -104,32 +150,30 @@ def test_meta_specialized():
     }
 
     try:
-        resp = requests.get(base_url, params=params, headers=headers, timeout=15)
-        if resp.status_code == 200:
-            return True, f"Success ({len(resp.text)} bytes) - Final URL: {resp.url}"
-        return False, f"Status {resp.status_code} - URL: {resp.url}"
+        with SESSION.get(base_url, params=params, headers=headers, timeout=15, stream=True) as resp:
+            if resp.status_code == 200:
+                return True, f"Success ({body_size(resp)} bytes) - Final URL: {resp.url}"
+            return False, f"Status {resp.status_code} - URL: {resp.url}"
     except Exception as e:
         return False, str(e)
 
 def main():
     print("=== STARTING SCRAPING TEST ===")
-    
-    # Test Salesforce (Standard Methods)
-    sf_url = TARGETS[0][1]
-    print(f"\nTarget: Salesforce")
-    test_requests_desktop(sf_url) # Just test one since we know it works
-    
-    # Test Meta (Standard + Specialized)
-    print(f"\nTarget: Meta")
-    print("-" * 30)
-    
-    # 1. Specialized Param Encoding
-    success, msg = test_meta_specialized()
-    print(f"{'✅ PASS' if success else '❌ FAIL'} | {msg}")
-    
-    # 2. Try simple Mobile User Agent on Base URL
-    log("Method: Mobile UA on Base URL (No Params)")
-    test_requests_mobile("https://www.metacareers.com/jobsearch")
+
+    # Every probe is independent and I/O bound, so run them all at once:
+    # each target x generic method, plus the Meta-specific variants
+    probes = [(name, method, (url,)) for name, url in TARGETS for method in METHODS]
+    probes.append(("Meta", test_meta_specialized, ()))
+    # Simple Mobile User Agent on Base URL (No Params)
+    probes.append(("Meta base", test_requests_mobile, ("https://www.metacareers.com/jobsearch",)))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {executor.submit(method, *args): (name, method.__name__)
+                   for name, method, args in probes}
+        for future in as_completed(futures):
+            name, method_name = futures[future]
+            success, msg = future.result()
+            print(f"{'✅ PASS' if success else '❌ FAIL'} | {name:<10} | {method_name} | {msg}")
 
 if __name__ == "__main__":
     main()
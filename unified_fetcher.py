@@ -3,6 +3,7 @@ Unified Fetcher with Smart Routing and Fallback.
 Routes between browser and HTTP fetching based on source configuration.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from dataclasses import dataclass
 import os
@@ -14,12 +15,13 @@ from logger import get_logger
 logger = get_logger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class JobSource:
     """Represents a job source with fetch configuration."""
     url: str
     name: str = ""
     requires_browser: bool = False
+    lazy_load: bool = False  # Listing loads more jobs on scroll (browser only)
     
     def __post_init__(self):
         if not self.name:
@@ -40,33 +42,30 @@ class UnifiedFetcher:
             enable_fallback: If True, falls back to HTTP when browser fails
         """
         self.enable_fallback = enable_fallback
+        # Resolved once: neither changes while the process runs
+        self.is_termux = os.path.exists("/data/data/com.termux")
+        self.browser_usable = SELENIUM_AVAILABLE and not self.is_termux
     
-    def fetch(self, url: str, requires_browser: bool = False) -> Optional[str]:
+    def _routes_to_browser(self, requires_browser: bool) -> bool:
+        """Whether fetch() would try the browser for this setting (never on Termux)."""
+        return requires_browser and self.browser_usable
+    
+    def fetch(self, url: str, requires_browser: bool = False, lazy_load: bool = False) -> Optional[str]:
         """
         Fetch HTML from a URL using the appropriate method.
         
         Args:
             url: The URL to fetch
             requires_browser: If True, uses headless browser (with HTTP fallback)
+            lazy_load: If True, the browser scrolls until the page stops growing
             
         Returns:
             HTML content or None if all methods failed
         """
-        html = None
-        method_used = None
-        
-        # Check for Termux environment
-        is_termux = False
-        try:
-            if os.path.exists("/data/data/com.termux"):
-                is_termux = True
-        except:
-            pass
-        
-        if requires_browser and SELENIUM_AVAILABLE and not is_termux:
+        if self._routes_to_browser(requires_browser):
             # Try browser first for JS-heavy sites (Only on Desktop/Non-Termux)
             logger.info(f"Using browser for: {url}")
-            html = browser_fetcher.fetch(url)
+            html = browser_fetcher.fetch(url, scroll=lazy_load)
             method_used = "browser"
             
             # Fallback to HTTP if browser fails
@@ -76,13 +75,12 @@ class UnifiedFetcher:
                 method_used = "http (fallback)"
         else:
             # Use fast HTTP fetch for static sites OR if we are on Termux
-            if requires_browser:
-                if is_termux:
-                    logger.info(f"Termux detected: Bypassing unstable browser, using robust HTTP fetch for: {url}")
-                elif not SELENIUM_AVAILABLE:
-                    logger.warning(f"Selenium not available, using HTTP: {url}")
-            else:
+            if not requires_browser:
                 logger.debug(f"Using HTTP for: {url}")
+            elif self.is_termux:
+                logger.info(f"Termux detected: Bypassing unstable browser, using robust HTTP fetch for: {url}")
+            else:
+                logger.warning(f"Selenium not available, using HTTP: {url}")
             html = fetcher.fetch(url)
             method_used = "http"
         
@@ -95,27 +93,48 @@ class UnifiedFetcher:
     
     def fetch_from_source(self, source: JobSource) -> Optional[str]:
         """Fetch HTML from a JobSource object."""
-        return self.fetch(source.url, source.requires_browser)
+        return self.fetch(source.url, source.requires_browser, source.lazy_load)
     
     def fetch_multiple(self, sources: list[JobSource]) -> dict[str, Optional[str]]:
         """
         Fetch HTML from multiple job sources.
         
+        Sources that go over plain HTTP are fetched together (a few at a time
+        per host, see Fetcher.fetch_multiple), while browser sources run on
+        the browser pool (with the usual HTTP fallback) at the same time.
+        
         Args:
             sources: List of JobSource objects
             
         Returns:
             Dictionary mapping URL to HTML content (or None if failed)
         """
-        results = {}
-        for source in sources:
-            results[source.url] = self.fetch_from_source(source)
+        browser_sources = [s for s in sources if self._routes_to_browser(s.requires_browser)]
+        http_urls = [s.url for s in sources if not self._routes_to_browser(s.requires_browser)]
+        if not browser_sources:
+            return self._fetch_http(http_urls) if http_urls else {}
+        
+        workers = min(len(browser_sources), browser_fetcher.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers + bool(http_urls)) as executor:
+            http_future = executor.submit(self._fetch_http, http_urls) if http_urls else None
+            results = dict(zip(
+                (s.url for s in browser_sources),
+                executor.map(self.fetch_from_source, browser_sources)
+            ))
+            if http_future:
+                results.update(http_future.result())
+        return results
+    
+    def _fetch_http(self, urls: list[str]) -> dict[str, Optional[str]]:
+        """Fetch a batch of URLs over plain HTTP and log how many succeeded."""
+        results = fetcher.fetch_multiple(list(dict.fromkeys(urls)))
+        failed = sum(1 for html in results.values() if not html)
+        logger.info(f"Fetched {len(results) - failed}/{len(results)} URLs over HTTP")
         return results
     
     def fetch_urls(self, urls: list[str], default_browser: bool = False) -> dict[str, Optional[str]]:
         """
-        Fetch multiple URLs with a default browser setting.
-        For backwards compatibility.
+        Fetch multiple URLs with a default browser setting (see fetch_multiple).
         
         Args:
             urls: List of URLs to fetch
@@ -124,11 +143,9 @@ class UnifiedFetcher:
         Returns:
             Dictionary mapping URL to HTML content
         """
-        results = {}
-        for url in urls:
-            results[url] = self.fetch(url, requires_browser=default_browser)
-        return results
-
+        return self.fetch_multiple([
+            JobSource(url, requires_browser=default_browser) for url in dict.fromkeys(urls)
+        ])
 
 # Default unified fetcher instance
 unified_fetcher = UnifiedFetcher()
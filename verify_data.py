@@ -4,7 +4,6 @@ Run this to verify your jobs are still in the database
 """
 
 from storage import storage
-import sqlite3
 
 print("=" * 70)
 print("  JOB DATABASE VERIFICATION")
@@ -36,18 +35,19 @@ sources = storage.get_sources()
 if not sources:
     print("\n⚠️  No sources configured. Add sources via the dashboard.")
 else:
-    # Get actual job counts from database
-    conn = sqlite3.connect(storage.db_path)
+    # Get actual job counts from database: one indexed GROUP BY pass, then
+    # match each source against the (few) distinct source URLs, the same
+    # case-insensitive substring match as LIKE '%url%'
+    url_counts = storage.get_job_counts_by_source_url()
+    
+    actual_counts = {
+        s['id']: sum(count for url, count in url_counts.items() if s['url'].lower() in url.lower())
+        for s in sources
+    }
     
     for s in sources:
         stored_count = s['job_count']
-        
-        # Count actual jobs in database for this source
-        cursor = conn.execute(
-            'SELECT COUNT(*) FROM jobs WHERE source_url LIKE ?',
-            (f"%{s['url']}%",)
-        )
-        actual_count = cursor.fetchone()[0]
+        actual_count = actual_counts[s['id']]
         
         print(f"\n📌 {s['name']}")
         print(f"   URL: {s['url'][:60]}...")
@@ -59,8 +59,6 @@ else:
             print(f"   ⚠️  MISMATCH: Stats need update (run pipeline to fix)")
         else:
             print(f"   ✅ Counts match")
-    
-    conn.close()
 
 # Recent jobs
 print("\n" + "=" * 70)
@@ -82,10 +80,7 @@ print("  RECOMMENDATIONS")
 print("=" * 70)
 
 if total_jobs > 0 and sources:
-    mismatches = sum(1 for s in sources if s['job_count'] != conn.execute(
-        'SELECT COUNT(*) FROM jobs WHERE source_url LIKE ?',
-        (f"%{s['url']}%",)
-    ).fetchone()[0])
+    mismatches = sum(1 for s in sources if s['job_count'] != actual_counts[s['id']])
     
     if mismatches > 0:
         print("\n✅ Your jobs are safe in the database!")
@@ -0,0 +1,18 @@
+"""
+Job Pipeline Tracker - WSGI entry point
+Serves the dashboard from a production WSGI server instead of Flask's dev server:
+
+    gunicorn -w 1 --threads 8 -b 0.0.0.0:5000 wsgi:app
+
+Keep a single worker process: the scheduler thread and its state live in
+the process, so more workers would each run the pipeline. Threads keep the
+dashboard responsive while a pipeline run is in progress.
+"""
+
+from server import app, start_scheduler
+
+# Same default as `python server.py`
+start_scheduler()
+
+# Name WSGI servers look for by default (e.g. `waitress-serve wsgi:application`)
+application = app